@@ -0,0 +1,204 @@
+import io
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from Bio import Entrez
+
+EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/{}.fcgi"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def http_status(error):
+    """HTTP status of a failed call: requests errors carry it on .response, urllib's HTTPError (Bio.Entrez) on .code."""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_permanent_error(error):
+    """True when NCBI rejected the request itself (4xx other than 429), so retrying cannot help."""
+    status = http_status(error)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def shared_bucket(rate):
+    """NCBI limits are per client, so every EntrezClient in the process shares one bucket per rate."""
+    with _buckets_lock:
+        if rate not in _buckets:
+            _buckets[rate] = TokenBucket(rate)
+        return _buckets[rate]
+
+
+class EntrezClient:
+    """Rate-limited, concurrent E-utilities client with pooled HTTP connections and exponential backoff.
+
+    NCBI allows 3 requests/s, or 10 requests/s with an API key. Passing `entrez` (e.g. an
+    Entrez_replay stand-in) routes all calls through that object instead of HTTP.
+    """
+
+    def __init__(self, api_key=None, email=None, max_workers=None, max_retries=4, backoff=1.0,
+                 timeout=60, entrez=None):
+        self.api_key = api_key or getattr(Entrez, "api_key", None)
+        self.email = email or Entrez.email
+        self.rate = 10 if self.api_key else 3
+        self.bucket = shared_bucket(self.rate)
+        self.max_workers = max_workers or self.rate
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.entrez = entrez
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
+
+    def _post(self, util, params):
+        data = {k: v for k, v in params.items() if v is not None}
+        data.setdefault("tool", "VirPhyKit")
+        if self.email:
+            data.setdefault("email", self.email)
+        if self.api_key:
+            data.setdefault("api_key", self.api_key)
+        response = self._session().post(EUTILS_URL.format(util), data=data, timeout=self.timeout)
+        if response.status_code in RETRY_STATUS:
+            raise requests.HTTPError(f"HTTP {response.status_code} from {util}", response=response)
+        response.raise_for_status()
+        return response
+
+    def _call(self, util, params, binary):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                if self.entrez is not None:
+                    with getattr(self.entrez, util)(**params) as handle:
+                        return handle.read()
+                response = self._post(util, params)
+                return response.content if binary else response.text
+            except (requests.RequestException, OSError) as e:
+                if attempt == self.max_retries:
+                    raise
+                status = http_status(e)
+                if status is not None and status not in RETRY_STATUS:
+                    raise
+                sleep = delay + random.uniform(0, delay / 2)
+                logging.warning(f"{util} failed ({str(e)}), retrying in {sleep:.1f}s")
+                time.sleep(sleep)
+                delay *= 2
+
+    def read(self, util, **params):
+        """Run an XML-returning utility (esearch, esummary, ...) and parse it with Entrez.read."""
+        data = self._call(util, params, binary=True)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return Entrez.read(io.BytesIO(data))
+
+    def esearch(self, **params):
+        return self.read("esearch", **params)
+
+    def esummary(self, **params):
+        return self.read("esummary", **params)
+
+    def efetch(self, **params):
+        """Return the efetch response as text."""
+        data = self._call("efetch", params, binary=False)
+        return data.decode("utf-8") if isinstance(data, bytes) else data
+
+    def efetch_many(self, requests_params, max_pending=None):
+        return self.map_many(self.efetch, requests_params, max_pending)
+
+    def esummary_many(self, requests_params, max_pending=None):
+        return self.map_many(self.esummary, requests_params, max_pending)
+
+    def map_many(self, func, requests_params, max_pending=None):
+        """Run several calls of `func` in flight; yields (index, result, error) in completion order.
+
+        At most `max_pending` responses (default 2 x max_workers) are submitted or waiting to be
+        consumed, so memory stays bounded by batch size when the caller is slower than the network.
+        """
+        if not requests_params:
+            return
+        max_pending = max_pending or 2 * self.max_workers
+        queue = iter(enumerate(requests_params))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {}
+            for idx, params in queue:
+                futures[pool.submit(func, **params)] = idx
+                if len(futures) >= max_pending:
+                    break
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = futures.pop(future)
+                    try:
+                        result = future.result(), None
+                    except Exception as e:
+                        result = None, e
+                    yield (idx,) + result
+                    next_item = next(queue, None)
+                    if next_item is not None:
+                        futures[pool.submit(func, **next_item[1])] = next_item[0]
+
+
+if __name__ == "__main__":
+    # Self-check: an injected Bio.Entrez-style backend raising urllib's HTTPError 400 must fail at once
+    # as a permanent error, while a 503 is retried.
+    from urllib.error import HTTPError
+
+    class FailingEntrez:
+        def __init__(self, code):
+            self.code = code
+            self.calls = 0
+
+        def efetch(self, **params):
+            self.calls += 1
+            raise HTTPError(EUTILS_URL.format("efetch"), self.code, "test", None, None)
+
+    for code, expected_calls, permanent in ((400, 1, True), (503, 3, False)):
+        backend = FailingEntrez(code)
+        client = EntrezClient(entrez=backend, max_retries=2, backoff=0.01)
+        try:
+            client.efetch(db="nucleotide", id="X")
+        except HTTPError as e:
+            assert is_permanent_error(e) is permanent, f"HTTP {code}: is_permanent_error -> {not permanent}"
+        assert backend.calls == expected_calls, f"HTTP {code}: {backend.calls} calls, expected {expected_calls}"
+        print(f"HTTP {code}: {backend.calls} call(s), permanent={permanent}: ok")
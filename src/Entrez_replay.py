@@ -0,0 +1,95 @@
+import hashlib
+import io
+import json
+import os
+import threading
+
+_IGNORED_PARAMS = {"email", "api_key", "tool", "timeout"}
+
+
+def request_key(func_name, params):
+    """Stable key for an E-utilities call, ignoring credentials."""
+    parts = [func_name]
+    for name in sorted(params):
+        if name in _IGNORED_PARAMS:
+            continue
+        parts.append(f"{name}={params[name]}")
+    return "&".join(parts)
+
+
+class RecordingEntrez:
+    """Pass-through to Bio.Entrez that saves every response into a directory for later replay."""
+
+    def __init__(self, directory, entrez=None):
+        if entrez is None:
+            from Bio import Entrez as entrez
+        self.entrez = entrez
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        else:
+            self.index = {}
+
+    def _record(self, func_name, params):
+        handle = getattr(self.entrez, func_name)(**params)
+        data = handle.read()
+        handle.close()
+        binary = isinstance(data, bytes)
+        key = request_key(func_name, params)
+        file_name = hashlib.sha1(key.encode("utf-8")).hexdigest() + (".bin" if binary else ".txt")
+        with open(os.path.join(self.directory, file_name), "wb") as f:
+            f.write(data if binary else data.encode("utf-8"))
+        with self._lock:
+            self.index[key] = {"file": file_name, "binary": binary}
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                json.dump(self.index, f, indent=1)
+        return io.BytesIO(data) if binary else io.StringIO(data)
+
+    def esearch(self, **params):
+        return self._record("esearch", params)
+
+    def efetch(self, **params):
+        return self._record("efetch", params)
+
+    def esummary(self, **params):
+        return self._record("esummary", params)
+
+    def read(self, handle, **kwargs):
+        return self.entrez.read(handle, **kwargs)
+
+
+class ReplayEntrez:
+    """Offline stand-in for Bio.Entrez serving responses captured by RecordingEntrez."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "index.json"), "r", encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.calls = []
+
+    def _replay(self, func_name, params):
+        key = request_key(func_name, params)
+        self.calls.append(key)
+        entry = self.index.get(key)
+        if entry is None:
+            raise KeyError(f"No recorded Entrez response for {key}")
+        with open(os.path.join(self.directory, entry["file"]), "rb") as f:
+            data = f.read()
+        return io.BytesIO(data) if entry["binary"] else io.StringIO(data.decode("utf-8"))
+
+    def esearch(self, **params):
+        return self._replay("esearch", params)
+
+    def efetch(self, **params):
+        return self._replay("efetch", params)
+
+    def esummary(self, **params):
+        return self._replay("esummary", params)
+
+    def read(self, handle, **kwargs):
+        from Bio import Entrez
+        return Entrez.read(handle, **kwargs)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import logging
+import os
+
+
+def run_signature(*parts):
+    """Hash identifying a fetch run; a checkpoint is only resumed when the signature matches."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (list, tuple)):
+            part = "\n".join(str(p) for p in part)
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class FetchCheckpoint:
+    """Append-only JSON-lines record of completed batches, so an interrupted fetch can resume.
+
+    The first line holds the run signature; each further line holds one finished batch and its payload,
+    plus the batch's accessions when the caller records them to detect reordered results on resume.
+    """
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+        self.done = {}
+        self.accessions = {}
+        self._resumable = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("signature") != self.signature:
+                    logging.info(f"Checkpoint {self.path} belongs to a different run, starting over")
+                    return
+                self._resumable = True
+                truncated = False
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        truncated = True  # partially written last line from an interrupted run
+                        break
+                    self.done[entry["batch"]] = entry["payload"]
+                    if "accessions" in entry:
+                        self.accessions[entry["batch"]] = entry["accessions"]
+            if truncated:
+                self._rewrite()
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable checkpoint {self.path}: {str(e)}")
+            self.done = {}
+            self.accessions = {}
+            self._resumable = False
+
+    @staticmethod
+    def _entry(batch_idx, payload, accessions):
+        entry = {"batch": batch_idx, "payload": payload}
+        if accessions is not None:
+            entry["accessions"] = accessions
+        return json.dumps(entry) + "\n"
+
+    def _rewrite(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"signature": self.signature}) + "\n")
+            for batch_idx, payload in self.done.items():
+                f.write(self._entry(batch_idx, payload, self.accessions.get(batch_idx)))
+
+    def is_done(self, batch_idx):
+        return batch_idx in self.done
+
+    def mark_done(self, batch_idx, payload, accessions=None):
+        self.done[batch_idx] = payload
+        if accessions is not None:
+            self.accessions[batch_idx] = accessions
+        try:
+            with open(self.path, "a" if self._resumable else "w", encoding="utf-8") as f:
+                if not self._resumable:
+                    f.write(json.dumps({"signature": self.signature}) + "\n")
+                    self._resumable = True
+                f.write(self._entry(batch_idx, payload, accessions))
+        except OSError as e:
+            logging.warning(f"Could not write checkpoint {self.path}: {str(e)}")
+
+    def clear(self):
+        self.done = {}
+        self.accessions = {}
+        self._resumable = False
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except OSError as e:
+            logging.warning(f"Could not remove checkpoint {self.path}: {str(e)}")
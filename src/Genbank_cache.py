@@ -0,0 +1,162 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+DEFAULT_CACHE_DIR = os.environ.get("VIRPHYKIT_CACHE_DIR",
+                                   os.path.join(os.path.expanduser("~"), ".virphykit"))
+DEFAULT_CACHE_FILE = os.path.join(DEFAULT_CACHE_DIR, "genbank_cache.sqlite3")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+_VERSION_RE = re.compile(r"^VERSION\s+(\S+)", re.MULTILINE)
+_ACCESSION_RE = re.compile(r"^ACCESSION\s+(\S+)", re.MULTILINE)
+
+
+def split_genbank_records(text):
+    """Split a GenBank flatfile string into single records, each ending with '//'."""
+    records = []
+    for chunk in text.split("\n//"):
+        chunk = chunk.strip("\n")
+        if chunk.strip():
+            records.append(chunk + "\n//\n")
+    return records
+
+
+def record_key(record_str):
+    """Return accession.version of a GenBank record string, or None."""
+    match = _VERSION_RE.search(record_str) or _ACCESSION_RE.search(record_str)
+    return match.group(1) if match else None
+
+
+def strip_version(accession):
+    return accession.split(".")[0].strip()
+
+
+class GenBankCache:
+    """Persistent GenBank flatfile cache keyed by accession.version with LRU eviction and optional TTL."""
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, max_bytes=DEFAULT_MAX_BYTES, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS records (
+                                key TEXT PRIMARY KEY,
+                                accession TEXT NOT NULL,
+                                data BLOB NOT NULL,
+                                size INTEGER NOT NULL,
+                                created REAL NOT NULL,
+                                accessed REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_records_accession ON records (accession)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_records_accessed ON records (accessed)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get_many(self, ids):
+        """Return {requested id: GenBank text} for ids held in the cache.
+
+        Versioned ids must match exactly; unversioned ids resolve to the newest cached version.
+        """
+        found = {}
+        if not ids:
+            return found
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            hits = []
+            expired = []
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                versioned = [x for x in chunk if "." in x]
+                unversioned = [x for x in chunk if "." not in x]
+                rows = []
+                if versioned:
+                    marks = ",".join("?" * len(versioned))
+                    rows.extend((key, key, data, created) for key, data, created in conn.execute(
+                        f"SELECT key, data, created FROM records WHERE key IN ({marks})", versioned))
+                if unversioned:
+                    marks = ",".join("?" * len(unversioned))
+                    rows.extend(conn.execute(
+                        f"SELECT accession, key, data, created FROM records WHERE accession IN ({marks}) "
+                        f"ORDER BY created", unversioned))
+                for requested, key, data, created in rows:
+                    if self._expired(created, now):
+                        expired.append(key)
+                        continue
+                    found[requested] = zlib.decompress(data).decode("utf-8")
+                    hits.append(key)
+            if expired:
+                conn.executemany("DELETE FROM records WHERE key = ?", [(k,) for k in expired])
+            if hits:
+                conn.executemany("UPDATE records SET accessed = ? WHERE key = ?", [(now, k) for k in hits])
+        return found
+
+    def put_many(self, records):
+        """Store GenBank record strings; records without a VERSION/ACCESSION line are ignored."""
+        now = time.time()
+        rows = []
+        for record_str in records:
+            key = record_key(record_str)
+            if not key:
+                continue
+            data = zlib.compress(record_str.encode("utf-8"))
+            rows.append((key, strip_version(key), data, len(data), now, now))
+        if not rows:
+            return 0
+        with self._lock, self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO records (key, accession, data, size, created, accessed) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._evict(conn)
+        return len(rows)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM records").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM records ORDER BY accessed"):
+            doomed.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM records WHERE key = ?", doomed)
+
+    def purge_expired(self):
+        if self.ttl is None:
+            return 0
+        with self._lock, self._connect() as conn:
+            cur = conn.execute("DELETE FROM records WHERE created < ?", (time.time() - self.ttl,))
+            return cur.rowcount
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM records")
+
+
+_shared_cache = None
+
+
+def get_shared_cache():
+    """Cache instance shared by SeqHarvester and SeqGrouper; None if the cache file cannot be opened."""
+    global _shared_cache
+    if _shared_cache is None:
+        try:
+            _shared_cache = GenBankCache()
+        except (OSError, sqlite3.Error):
+            return None
+    return _shared_cache
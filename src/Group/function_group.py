@@ -1,14 +1,22 @@
-import csv
+import logging
 import os
 import sys
-from PyQt5.QtWidgets import QFileDialog, QTableWidgetItem, QTableWidget
+from PyQt5.QtWidgets import QFileDialog, QTableView, QMessageBox
 from PyQt5.QtCore import QThread, pyqtSignal
 from Bio import SeqIO
 from Bio import Entrez
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from io import StringIO
-import time
 from matplotlib import pyplot as plt
+from Entrez_client import EntrezClient, is_permanent_error
+from Genbank_cache import get_shared_cache, split_genbank_records, record_key, strip_version
+from Genbank_scan import iter_file_chunks, scan_record
+from Fetch_checkpoint import FetchCheckpoint, run_signature
+from Harvest_estimate import estimate_harvest
+from Location_mapping import load_mapping
+from Group.model_group import metadata_frame
 
 
 class DownloadWorker(QThread):
@@ -16,57 +24,260 @@ class DownloadWorker(QThread):
     finished = pyqtSignal(list)
     error = pyqtSignal(str)
 
-    def __init__(self, accession_list, parent=None):
+    def __init__(self, accession_list, metadata_only=False, api_key=None, checkpoint_path=None, parent=None):
         super().__init__(parent)
-        self.accession_list = accession_list
+        self.accession_list = normalize_accessions(accession_list)
+        self.metadata_only = metadata_only
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint = None
+        self.failed_batches = 0
         self.batch_size = 500
         Entrez.email = "your_email@example.com"
+        self.client = EntrezClient(api_key=api_key or None, timeout=30)
 
     def run(self):
-        data = []
         total = len(self.accession_list)
         total_batches = (total + self.batch_size - 1) // self.batch_size
+        cache = get_shared_cache()
+        batch_results = [[] for _ in range(total_batches)]
+        pending = []
+        if self.checkpoint_path:
+            self.checkpoint = FetchCheckpoint(self.checkpoint_path,
+                                              run_signature(self.accession_list, self.batch_size, self.metadata_only))
+            if self.checkpoint.done:
+                self.progress.emit(f"Resuming: {len(self.checkpoint.done)}/{total_batches} batches already completed",
+                                   int(len(self.checkpoint.done) * 100 / total_batches))
 
         for batch_idx, start in enumerate(range(0, total, self.batch_size)):
             batch = self.accession_list[start:start + self.batch_size]
+            if self.checkpoint and self.checkpoint.is_done(batch_idx):
+                batch_results[batch_idx] = self.checkpoint.done[batch_idx]
+                continue
+            cached = cache.get_many(batch) if cache else {}
+            if cached and self.metadata_only:
+                batch_results[batch_idx].extend(
+                    parse_scanned_record(scan_record(cached[acc], feature_types=("source",)))
+                    for acc in batch if acc in cached)
+            elif cached:
+                cached_text = "".join(cached[acc] for acc in batch if acc in cached)
+                with StringIO(cached_text) as genbank_handle:
+                    batch_results[batch_idx].extend(
+                        parse_single_record(record) for record in SeqIO.parse(genbank_handle, "genbank"))
+            missing = [acc for acc in batch if acc not in cached]
+            if missing:
+                pending.append((batch_idx, missing))
+
+        done = total_batches - len(pending)
+        if done:
+            self.progress.emit(f"Loaded {done}/{total_batches} batches from checkpoint or local cache",
+                               int(done * 100 / total_batches))
+
+        if self.metadata_only:
+            self.fetch_summaries(pending, batch_results, done, total_batches)
+        else:
+            self.fetch_records(pending, batch_results, done, total_batches)
+        self.finish_checkpoint()
+        data = [entry for batch_data in batch_results for entry in batch_data]
+        self.finished.emit(data)
+
+    def batch_completed(self, batch_idx, batch_data):
+        if self.checkpoint:
+            self.checkpoint.mark_done(batch_idx, batch_data)
+
+    def finish_checkpoint(self):
+        if not self.checkpoint:
+            return
+        if self.failed_batches:
+            self.error.emit(f"{self.failed_batches} batches failed; run again to resume from "
+                            f"{os.path.basename(self.checkpoint_path)}")
+        else:
+            self.checkpoint.clear()
+
+    def fetch_records(self, pending, batch_results, done, total_batches):
+        cache = get_shared_cache()
+
+        def fetch(ids):
+            return self.client.efetch(db="nucleotide", id=",".join(ids), rettype="gb", retmode="text")
+
+        params = [dict(db="nucleotide", id=",".join(batch), rettype="gb", retmode="text") for _, batch in pending]
+        for idx, genbank_data, error in self.client.efetch_many(params):
+            batch_idx, batch = pending[idx]
+            batch_num = batch_idx + 1
+            done += 1
+            progress_percent = int(done * 100 / total_batches)
+            if error is not None:
+                texts = self.recover_batch(fetch, batch, batch_num, error)
+                if texts is None:
+                    continue
+                genbank_data = "".join(texts)
+            self.progress.emit(f"Parsing information...{done}/{total_batches}", progress_percent)
+            if cache:
+                cache.put_many(split_genbank_records(genbank_data))
+            entries, skipped = parse_genbank_text(genbank_data)
+            for accession, message in skipped:
+                self.error.emit(f"Skipped malformed record {accession}: {message}")
+            self.report_missing(batch, [entry["ID"] for entry in entries], batch_num)
+            batch_results[batch_idx].extend(entries)
+            self.batch_completed(batch_idx, batch_results[batch_idx])
+
+    def fetch_summaries(self, pending, batch_results, done, total_batches):
+        # esummary 2.0 DocSums carry length, organism and source qualifiers (SubType/SubName)
+        # without any sequence data.
+        def fetch(ids):
+            return self.client.esummary(db="nuccore", id=",".join(ids), version="2.0")
+
+        params = [dict(db="nuccore", id=",".join(batch), version="2.0") for _, batch in pending]
+        for idx, summary, error in self.client.esummary_many(params):
+            batch_idx, batch = pending[idx]
             batch_num = batch_idx + 1
-            progress_percent = int((batch_idx + 1) * 100 / total_batches)
+            done += 1
+            progress_percent = int(done * 100 / total_batches)
+            summaries = [summary]
+            if error is not None:
+                summaries = self.recover_batch(fetch, batch, batch_num, error)
+                if summaries is None:
+                    continue
+            self.progress.emit(f"Parsing information...{done}/{total_batches}", progress_percent)
+            entries = [parse_summary_record(docsum) for summary in summaries
+                       for docsum in summary.get("DocumentSummarySet", {}).get("DocumentSummary", [])
+                       if docsum.get("AccessionVersion")]
+            self.report_missing(batch, [entry["ID"] for entry in entries], batch_num)
+            batch_results[batch_idx].extend(entries)
+            self.batch_completed(batch_idx, batch_results[batch_idx])
+
+    def recover_batch(self, fetch, batch, batch_num, error):
+        """Bisect a batch NCBI rejected; returns the partial results, or None if the batch failed outright."""
+        if not is_permanent_error(error):
+            self.failed_batches += 1
+            self.error.emit(f"Failed batch {batch_num} after {self.client.max_retries + 1} attempts: {str(error)}")
+            return None
+        self.progress.emit(f"Batch {batch_num} rejected by NCBI, isolating invalid accessions...", 0)
+        try:
+            results, bad_ids = bisect_fetch(fetch, batch)
+        except Exception as e:
+            self.failed_batches += 1
+            self.error.emit(f"Failed batch {batch_num}: {str(e)}")
+            return None
+        if bad_ids:
+            logging.warning(f"Batch {batch_num}: NCBI rejected accessions {', '.join(bad_ids)}")
+            self.error.emit(f"Batch {batch_num}: {len(bad_ids)} invalid accessions skipped: "
+                            f"{', '.join(bad_ids[:10])}{' ...' if len(bad_ids) > 10 else ''}")
+        return results
+
+    def report_missing(self, batch, returned_ids, batch_num):
+        returned = {strip_version(acc) for acc in returned_ids}
+        missing = [acc for acc in batch if strip_version(acc) not in returned]
+        if missing:
+            logging.warning(f"Batch {batch_num}: no record returned for {', '.join(missing)}")
+            self.error.emit(f"Batch {batch_num}: {len(missing)} accessions returned no record: "
+                            f"{', '.join(missing[:10])}{' ...' if len(missing) > 10 else ''}")
+
+
+class EstimateWorker(QThread):
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
 
-            for attempt in range(3, 0, -1):
-                try:
-                    self.progress.emit(f"Parsing information...{batch_num}/{total_batches}", progress_percent)
-                    with Entrez.efetch(db="nucleotide",
-                                       id=",".join(batch),
-                                       rettype="gb",
-                                       retmode="text",
-                                       timeout=30) as handle:
-                        genbank_data = handle.read()
+    def __init__(self, accession_list, metadata_only=False, api_key=None, parent=None):
+        super().__init__(parent)
+        self.accession_list = normalize_accessions(accession_list)
+        self.metadata_only = metadata_only
+        self.client = EntrezClient(api_key=api_key or None, timeout=30)
 
-                    if not genbank_data.strip():
-                        self.progress.emit(f"No data for batch {batch_num}", progress_percent)
-                        break
+    def run(self):
+        try:
+            estimate = estimate_harvest(self.client, len(self.accession_list), ids=self.accession_list,
+                                        rettype="summary" if self.metadata_only else "gb")
+            self.finished.emit(estimate.summary())
+        except Exception as e:
+            self.error.emit(f"Estimate failed: {str(e)}")
 
-                    with StringIO(genbank_data) as genbank_handle:
-                        records = list(SeqIO.parse(genbank_handle, "genbank"))
 
-                    if not records:
-                        self.progress.emit(f"No records parsed for batch {batch_num}", progress_percent)
-                        break
+class LocalParseWorker(QThread):
+    progress = pyqtSignal(str, int)
+    finished = pyqtSignal(list)
+    error = pyqtSignal(str)
 
-                    batch_data = [parse_single_record(record) for record in records]
-                    data.extend(batch_data)
-                    break
+    def __init__(self, file_path, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.max_workers = max_workers or os.cpu_count() or 1
 
-                except Exception as e:
-                    if attempt > 1:
-                        time.sleep(5)
-                    else:
-                        self.error.emit(f"Failed batch {batch_num} after 3 attempts: {str(e)}")
-                        break
+    def run(self):
+        """Parse the flatfile in one pass: blocks cut at '//' are parsed across a process pool, in order."""
+        try:
+            total_bytes = max(os.path.getsize(self.file_path), 1)
+            data = []
+            pending = deque()
+
+            def collect():
+                future, position = pending.popleft()
+                entries, skipped = future.result()
+                data.extend(entries)
+                for accession, message in skipped:
+                    self.error.emit(f"Skipped malformed record {accession}: {message}")
+                self.progress.emit(f"Parsing local GenBank file... {len(data)} records",
+                                   int(position * 100 / total_bytes))
+
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                for position, text in iter_file_chunks(self.file_path):
+                    pending.append((pool.submit(parse_genbank_text, text), position))
+                    if len(pending) >= 2 * self.max_workers:
+                        collect()
+                while pending:
+                    collect()
+            self.finished.emit(data)
+        except Exception as e:
+            self.error.emit(f"Error parsing local file: {str(e)}")
+            self.finished.emit([])
 
-                time.sleep(1)
 
-        self.finished.emit(data)
+def parse_genbank_text(genbank_data):
+    """Parse flatfile text into metadata entries; returns (entries, [(accession, error)]).
+
+    One malformed record should not cost the whole text, so a failed parse is retried record by record.
+    """
+    try:
+        with StringIO(genbank_data) as genbank_handle:
+            return [parse_single_record(record) for record in SeqIO.parse(genbank_handle, "genbank")], []
+    except Exception:
+        entries, skipped = [], []
+        for record_str in split_genbank_records(genbank_data):
+            try:
+                entries.append(parse_single_record(SeqIO.read(StringIO(record_str), "genbank")))
+            except Exception as e:
+                skipped.append((record_key(record_str), str(e)))
+        return entries, skipped
+
+
+def bisect_fetch(fetch, ids):
+    """Call fetch(ids), splitting the id list on permanent NCBI errors; returns (results, rejected ids)."""
+    try:
+        return [fetch(ids)], []
+    except Exception as e:
+        if not is_permanent_error(e):
+            raise
+        if len(ids) == 1:
+            return [], list(ids)
+    mid = len(ids) // 2
+    left, left_bad = bisect_fetch(fetch, ids[:mid])
+    right, right_bad = bisect_fetch(fetch, ids[mid:])
+    return left + right, left_bad + right_bad
+
+
+def normalize_accessions(accession_list):
+    """Strip, upper-case and deduplicate accessions; an unversioned id is dropped when a versioned form is present."""
+    cleaned = []
+    seen = set()
+    versioned_bases = set()
+    for acc in accession_list:
+        acc = acc.strip().strip(",;").upper()
+        if not acc or acc in seen:
+            continue
+        seen.add(acc)
+        cleaned.append(acc)
+        if "." in acc:
+            versioned_bases.add(strip_version(acc))
+    return [acc for acc in cleaned if "." in acc or acc not in versioned_bases]
 
 
 def parse_single_record(record):
@@ -81,29 +292,65 @@ def parse_single_record(record):
     }
     for feature in record.features:
         if feature.type == "source":
-            qualifiers = feature.qualifiers
-            if "isolate" in qualifiers:
-                entry["Isolate"] = qualifiers["isolate"][0]
-            if "host" in qualifiers:
-                entry["Host"] = qualifiers["host"][0]
-            if "geo_loc_name" in qualifiers:
-                geo_loc = qualifiers["geo_loc_name"][0]
-                entry["Geo Location"] = geo_loc.split(":")[0].strip() if ":" in geo_loc else geo_loc
-            elif "country" in qualifiers:
-                geo_loc = qualifiers["country"][0]
-                entry["Geo Location"] = geo_loc.split(":")[0].strip() if ":" in geo_loc else geo_loc
-            if "collection_date" in qualifiers:
-                date_str = qualifiers["collection_date"][0]
-                for fmt in ("%d-%b-%Y", "%Y-%m-%d", "%Y"):
-                    try:
-                        date_obj = datetime.strptime(date_str, fmt)
-                        entry["Collection Date"] = date_obj.strftime("%Y-%m-%d")
-                        break
-                    except ValueError:
-                        entry["Collection Date"] = date_str
+            apply_source_qualifiers(entry, feature.qualifiers)
     return entry
 
 
+def parse_scanned_record(record):
+    entry = {
+        "Isolate": "N/A",
+        "ID": record.id,
+        "Organism": record.organism,
+        "Length": record.length,
+        "Host": "N/A",
+        "Geo Location": "N/A",
+        "Collection Date": "N/A"
+    }
+    for feature in record.features:
+        if feature.type == "source":
+            apply_source_qualifiers(entry, feature.qualifiers)
+    return entry
+
+
+def parse_summary_record(docsum):
+    entry = {
+        "Isolate": "N/A",
+        "ID": str(docsum.get("AccessionVersion")),
+        "Organism": str(docsum.get("Organism") or "N/A"),
+        "Length": int(docsum.get("Slen") or 0),
+        "Host": "N/A",
+        "Geo Location": "N/A",
+        "Collection Date": "N/A"
+    }
+    sub_types = str(docsum.get("SubType", "")).split("|")
+    sub_names = str(docsum.get("SubName", "")).split("|")
+    qualifiers = {name: [value] for name, value in zip(sub_types, sub_names) if name}
+    apply_source_qualifiers(entry, qualifiers)
+    return entry
+
+
+def apply_source_qualifiers(entry, qualifiers):
+    if "isolate" in qualifiers:
+        entry["Isolate"] = qualifiers["isolate"][0]
+    if "host" in qualifiers:
+        entry["Host"] = qualifiers["host"][0]
+    if "geo_loc_name" in qualifiers:
+        geo_loc = qualifiers["geo_loc_name"][0]
+        entry["Geo Location"] = geo_loc.split(":")[0].strip() if ":" in geo_loc else geo_loc
+    elif "country" in qualifiers:
+        geo_loc = qualifiers["country"][0]
+        entry["Geo Location"] = geo_loc.split(":")[0].strip() if ":" in geo_loc else geo_loc
+    if "collection_date" in qualifiers:
+        date_str = qualifiers["collection_date"][0]
+        for fmt in ("%d-%b-%Y", "%Y-%m-%d", "%Y"):
+            try:
+                date_obj = datetime.strptime(date_str, fmt)
+                entry["Collection Date"] = date_obj.strftime("%Y-%m-%d")
+                break
+            except ValueError:
+                entry["Collection Date"] = date_str
+
+
 class ProcessData:
     @staticmethod
     def select_seq_file(window):
@@ -143,30 +390,24 @@ class ProcessData:
     def parse_genbank(window):
         if window.seq_file_path:
             window.statusBar().showMessage("Parsing local GenBank file...", 5000)
+            window.worker = LocalParseWorker(window.seq_file_path)
+            window.worker.progress.connect(
+                lambda msg, pct: window.statusBar().showMessage(msg, 5000) or window.progress_bar.setValue(pct))
+            window.worker.finished.connect(lambda data: ProcessData.on_download_finished(window, data))
+            window.worker.error.connect(lambda msg: window.statusBar().showMessage(msg, 10000))
             window.progress_bar.setVisible(True)
             window.progress_bar.setValue(0)
-            data = []
-            try:
-                total_records = sum(1 for _ in SeqIO.parse(window.seq_file_path, "genbank"))
-                with open(window.seq_file_path, 'r', encoding='utf-8') as f:
-                    records = SeqIO.parse(f, "genbank")
-                    for i, record in enumerate(records):
-                        entry = parse_single_record(record)
-                        data.append(entry)
-                        progress = int((i + 1) * 100 / total_records)
-                        window.progress_bar.setValue(progress)
-                window.statusBar().showMessage("Local file parsed successfully.", 5000)
-                window.progress_bar.setVisible(False)
-                return data
-            except Exception as e:
-                window.statusBar().showMessage(f"Error parsing local file: {str(e)}", 10000)
-                window.progress_bar.setVisible(False)
-                return []
+            window.show_button.setEnabled(False)
+            window.worker.start()
+            return None
         elif window.accession_file_path:
             with open(window.accession_file_path, 'r', encoding='utf-8') as f:
                 accession_list = [line.strip() for line in f if line.strip()]
             if accession_list:
-                window.worker = DownloadWorker(accession_list)
+                window.worker = DownloadWorker(accession_list,
+                                               metadata_only=window.metadata_only_checkbox.isChecked(),
+                                               api_key=window.api_key_input.text().strip(),
+                                               checkpoint_path=window.accession_file_path + ".checkpoint.jsonl")
                 window.worker.progress.connect(
                     lambda msg, pct: window.statusBar().showMessage(msg, 5000) or window.progress_bar.setValue(pct))
                 window.worker.finished.connect(lambda data: ProcessData.on_download_finished(window, data))
@@ -176,9 +417,25 @@ class ProcessData:
                 window.worker.start()
             return None
 
+    @staticmethod
+    def estimate_download(window):
+        if not window.accession_file_path:
+            window.statusBar().showMessage("Select an accession file to estimate its download", 5000)
+            return
+        with open(window.accession_file_path, 'r', encoding='utf-8') as f:
+            accession_list = [line.strip() for line in f if line.strip()]
+        window.estimate_worker = EstimateWorker(accession_list,
+                                                metadata_only=window.metadata_only_checkbox.isChecked(),
+                                                api_key=window.api_key_input.text().strip())
+        window.estimate_worker.finished.connect(
+            lambda text: QMessageBox.information(window, "Download estimate", text))
+        window.estimate_worker.error.connect(lambda msg: window.statusBar().showMessage(msg, 10000))
+        window.statusBar().showMessage("Estimating download...", 5000)
+        window.estimate_worker.start()
+
     @staticmethod
     def on_download_finished(window, data):
-        window.data = data
+        window.metadata = metadata_frame(data) if data else None
         ProcessData.show_table_data(window)
         window.progress_bar.setVisible(False)
         window.show_button.setEnabled(True)
@@ -186,47 +443,21 @@ class ProcessData:
 
     @staticmethod
     def show_table(window):
-        window.data = ProcessData.parse_genbank(window)
-        if window.data is not None:
+        data = ProcessData.parse_genbank(window)
+        if data is not None:
+            window.metadata = metadata_frame(data) if data else None
             ProcessData.show_table_data(window)
 
     @staticmethod
     def show_table_data(window):
-        if not window.data:
+        if window.metadata is None or window.metadata.empty:
             window.statusBar().showMessage("No data to display.", 5000)
             return
         try:
-            has_groups = any("Group" in record for record in window.data)
-            column_count = 8 if has_groups else 7
-            window.table.setColumnCount(column_count)
-            headers = ["Isolate", "ID", "Organism", "Length", "Host", "Geo Location", "Collection Date"]
-            if has_groups:
-                headers.append("Group")
-            window.table.setHorizontalHeaderLabels(headers)
-
-            window.table.setRowCount(len(window.data))
-            for row, record in enumerate(window.data):
-                window.table.setItem(row, 0, QTableWidgetItem(str(record.get("Isolate", "N/A"))))
-                window.table.setItem(row, 1, QTableWidgetItem(str(record.get("ID", "N/A"))))
-                window.table.setItem(row, 2, QTableWidgetItem(str(record.get("Organism", "N/A"))))
-                window.table.setItem(row, 3, QTableWidgetItem(str(record.get("Length", "0"))))
-                window.table.setItem(row, 4, QTableWidgetItem(str(record.get("Host", "N/A"))))
-                window.table.setItem(row, 5, QTableWidgetItem(str(record.get("Geo Location", "N/A"))))
-                window.table.setItem(row, 6, QTableWidgetItem(str(record.get("Collection Date", "N/A"))))
-                if has_groups:
-                    group = str(record.get("Group", "N/A"))
-                    window.table.setItem(row, 7, QTableWidgetItem(group))
-
-            window.table.setColumnWidth(0, 100)
-            window.table.setColumnWidth(1, 100)
-            window.table.setColumnWidth(2, 150)
-            window.table.setColumnWidth(3, 80)
-            window.table.setColumnWidth(4, 150)
-            window.table.setColumnWidth(5, 100)
-            window.table.setColumnWidth(6, 100)
-            if has_groups:
-                window.table.setColumnWidth(7, 100)
-            window.table.setEditTriggers(QTableWidget.DoubleClicked)
+            window.table_model.set_frame(window.metadata)
+            for column, width in enumerate([100, 100, 150, 80, 150, 100, 100, 100][:len(window.metadata.columns)]):
+                window.table.setColumnWidth(column, width)
+            window.table.setEditTriggers(QTableView.DoubleClicked)
             window.save_button.setEnabled(True)
             window.statusBar().showMessage("Table data loaded successfully.", 5000)
         except Exception as e:
@@ -234,26 +465,23 @@ class ProcessData:
 
     @staticmethod
     def preview_groups(window, column_index=-1):
-        if window.table.rowCount() == 0:
+        if window.metadata is None or window.metadata.empty:
             window.statusBar().showMessage("Please load data first.", 5000)
             return
         use_mapping = window.use_mapping_checkbox.isChecked()
         print(f"Received column_index: {column_index}")
         try:
-            if column_index < 0 or column_index >= window.table.columnCount():
+            if column_index < 0 or column_index >= window.table_model.columnCount():
                 group_col = window.last_group_column if hasattr(window,
                                                                 'last_group_column') and window.last_group_column >= 0 else 5
-                column_name = window.table.horizontalHeaderItem(group_col).text() if window.table.horizontalHeaderItem(
-                    group_col) else f"Column {group_col}"
             else:
                 group_col = column_index
-                column_name = window.table.horizontalHeaderItem(group_col).text() if window.table.horizontalHeaderItem(
-                    group_col) else f"Column {group_col}"
+            column_name = window.table_model.column_name(group_col)
             print(f"Grouping by column: {column_name} (index: {group_col})")
         except Exception as e:
             window.statusBar().showMessage(f"Error determining grouping column: {str(e)}", 10000)
             return
-        group_map = {}
+        mapping = None
         unmatched = set()
 
         if use_mapping:
@@ -266,6 +494,8 @@ class ProcessData:
                     else:
                         base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
                     region_file_path = os.path.join(base_path, "Mapping.txt")
+                    if not os.path.exists(region_file_path):
+                        region_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Mapping.txt")
                     print(f"Default mapping file path: {region_file_path}")
                     if not os.path.exists(region_file_path):
                         window.statusBar().showMessage(f"Default Mapping file not found at: {region_file_path}", 10000)
@@ -273,67 +503,26 @@ class ProcessData:
                     window.statusBar().showMessage(f"Using default Mapping.txt from: {region_file_path}", 5000)
                 else:
                     window.statusBar().showMessage(f"Using custom mapping table: {region_file_path}", 5000)
-                with open(region_file_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if line.strip():
-                            try:
-                                group, value = line.strip().split('\t')
-                                group_map[value.lower()] = group
-                            except ValueError:
-                                window.statusBar().showMessage(
-                                    f"Invalid format in mapping table: each line must contain group and value separated by tab",
-                                    10000)
-                                return
+                mapping = load_mapping(region_file_path)
+            except ValueError as e:
+                window.statusBar().showMessage(f"Invalid format in mapping table: {str(e)}", 10000)
+                return
             except Exception as e:
                 window.statusBar().showMessage(f"Error reading mapping table at {region_file_path}: {str(e)}", 10000)
                 return
         else:
             window.statusBar().showMessage(f"Direct grouping by {column_name} (no mapping table used)", 5000)
-        group_counts = {}
-        group_col_name = "Group"
-        existing_group_col = 7 if window.table.columnCount() == 8 else -1
-
         try:
-            for row in range(window.table.rowCount()):
-                item = window.table.item(row, group_col)
-                value = item.text() if item else "N/A"
-
-                if use_mapping and value != "N/A":
-                    val_lower = value.lower()
-                    if val_lower == "united states":
-                        val_lower = "usa"
-                    group = group_map.get(val_lower, "Unknown")
-                    if group == "Unknown":
-                        unmatched.add(value)
-                else:
-                    group = value if value != "N/A" else "N/A"
-
-                if row < len(window.data):
-                    window.data[row][column_name] = value
-                    window.data[row]["Group"] = group
-                else:
-                    window.data.append({
-                        "Isolate": window.table.item(row, 0).text() if window.table.item(row, 0) else "N/A",
-                        "ID": window.table.item(row, 1).text() if window.table.item(row, 1) else "N/A",
-                        "Organism": window.table.item(row, 2).text() if window.table.item(row, 2) else "N/A",
-                        "Length": window.table.item(row, 3).text() if window.table.item(row, 3) else "0",
-                        "Host": window.table.item(row, 4).text() if window.table.item(row, 4) else "N/A",
-                        "Geo Location": window.table.item(row, 5).text() if window.table.item(row, 5) else "N/A",
-                        "Collection Date": window.table.item(row, 6).text() if window.table.item(row, 6) else "N/A",
-                        "Group": group
-                    })
-
-                if existing_group_col == -1:
-                    window.table.setColumnCount(8)
-                    window.table.setHorizontalHeaderLabels(
-                        ["Isolate", "ID", "Organism", "Length", "Host", "Geo Location", "Collection Date", "Group"]
-                    )
-                    window.table.setColumnWidth(7, 100)
-                    existing_group_col = 7
-                window.table.setItem(row, existing_group_col, QTableWidgetItem(group))
-
-                if group != "N/A":
-                    group_counts[group] = group_counts.get(group, 0) + 1
+            values = window.metadata.iloc[:, group_col].astype(str)
+            if use_mapping:
+                groups = mapping.map_series(values)
+                groups[values == "N/A"] = "N/A"
+                unmatched = set(values[groups == "Unknown"])
+            else:
+                groups = values
+            window.table_model.set_column("Group", groups.astype("category"))
+            window.table.setColumnWidth(window.metadata.columns.get_loc("Group"), 100)
+            group_counts = groups[groups != "N/A"].value_counts(sort=False).to_dict()
         except Exception as e:
             window.statusBar().showMessage(f"Error processing groups: {str(e)}", 10000)
             return
@@ -370,20 +559,11 @@ class ProcessData:
 
     @staticmethod
     def save_to_csv(window):
-        if window.table.rowCount() > 0:
+        if window.metadata is not None and not window.metadata.empty:
             file_path, _ = QFileDialog.getSaveFileName(window, "Save as CSV", "", "CSV Files (*.csv)")
             if file_path:
                 try:
-                    with open(file_path, 'w', newline='') as csvfile:
-                        writer = csv.writer(csvfile)
-                        headers = ["Isolate", "ID", "Organism", "Length", "Host", "Geo Location", "Collection Date"]
-                        if window.table.columnCount() == 8:
-                            headers.append("Group")
-                        writer.writerow(headers)
-                        for row in range(window.table.rowCount()):
-                            row_data = [window.table.item(row, col).text() if window.table.item(row, col) else "N/A" for
-                                        col in range(window.table.columnCount())]
-                            writer.writerow(row_data)
+                    window.metadata.to_csv(file_path, index=False)
                     window.statusBar().showMessage(f"Saved to {file_path}", 5000)
                 except Exception as e:
                     window.statusBar().showMessage(f"Error saving to CSV: {str(e)}", 10000)
@@ -1,15 +1,16 @@
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QLabel, QGroupBox, QLineEdit,
-                             QTableWidget, QProgressBar, QSizePolicy, QCheckBox)
+                             QTableView, QProgressBar, QSizePolicy, QCheckBox)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from Group.function_group import process_data
+from Group.model_group import MetadataTableModel
 
 class GroupModule(QMainWindow):
     def __init__(self):
         super().__init__()
         self.initUI()
-        self.data = []
+        self.metadata = None
         self.worker = None
         self.seq_file_path = None
         self.accession_file_path = None
@@ -90,6 +91,11 @@ class GroupModule(QMainWindow):
         self.api_key_input.setStyleSheet("padding: 3px; border: 1px solid #ddd; border-radius: 5px;")
         self.api_key_input.setPlaceholderText("Enter NCBI API key for faster requests")
         settings_layout.addWidget(self.api_key_input)
+        self.metadata_only_checkbox = QCheckBox("Metadata only (skip sequence download)")
+        self.metadata_only_checkbox.setStyleSheet("font-size: 12px;")
+        self.metadata_only_checkbox.setToolTip("Retrieve isolate, host, location, date and length from NCBI "
+                                               "document summaries without transferring sequences.")
+        settings_layout.addWidget(self.metadata_only_checkbox)
 
         accession_label = QLabel("Accession File (.txt):")
         accession_label.setStyleSheet("font-size: 12px;")
@@ -195,8 +201,9 @@ class GroupModule(QMainWindow):
         table_layout.setSpacing(5)
         table_layout.setContentsMargins(10, 5, 10, 5)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(0)
+        self.table = QTableView()
+        self.table_model = MetadataTableModel(parent=self)
+        self.table.setModel(self.table_model)
         self.table.horizontalHeader().sectionClicked.connect(self.on_header_clicked)
         table_layout.addWidget(self.table)
 
@@ -227,6 +234,24 @@ class GroupModule(QMainWindow):
         self.show_button.setEnabled(False)
         button_layout.addWidget(self.show_button)
 
+        self.estimate_button = QPushButton("Estimate")
+        self.estimate_button.setStyleSheet("""
+            QPushButton {
+                padding: 5px 10px;
+                background-color: #2196F3;
+                color: white;
+                border-radius: 5px;
+                font-weight: bold;
+                font-size: 12px;
+            }
+            QPushButton:hover {
+                background-color: #00008b;
+            }
+        """)
+        self.estimate_button.setToolTip("Dry run: count records and project download size and duration")
+        self.estimate_button.clicked.connect(self.estimate_download)
+        button_layout.addWidget(self.estimate_button)
+
         self.preview_button = QPushButton("View")
         self.preview_button.setStyleSheet("""
             QPushButton {
@@ -301,7 +326,7 @@ class GroupModule(QMainWindow):
     def preview_groups(self):
         try:
             print("Preview button clicked")
-            column_name = self.table.horizontalHeaderItem(self.last_group_column).text() if self.last_group_column >= 0 and self.table.horizontalHeaderItem(self.last_group_column) else "Geo Location"
+            column_name = self.table_model.column_name(self.last_group_column) if self.last_group_column >= 0 else "Geo Location"
             print(f"Using last clicked column: {column_name} (index: {self.last_group_column})")
             process_data.preview_groups(self, self.last_group_column)
         except Exception as e:
@@ -309,7 +334,7 @@ class GroupModule(QMainWindow):
 
     def on_header_clicked(self, column_index):
         try:
-            column_name = self.table.horizontalHeaderItem(column_index).text() if self.table.horizontalHeaderItem(column_index) else f"Column {column_index}"
+            column_name = self.table_model.column_name(column_index)
             print(f"Header clicked: {column_name} (index: {column_index})")
             self.last_group_column = column_index
             process_data.preview_groups(self, column_index)
@@ -322,6 +347,12 @@ class GroupModule(QMainWindow):
         except Exception as e:
             self.statusBar().showMessage(f"Error showing table: {str(e)}", 10000)
 
+    def estimate_download(self):
+        try:
+            process_data.estimate_download(self)
+        except Exception as e:
+            self.statusBar().showMessage(f"Error estimating download: {str(e)}", 10000)
+
     def save_to_csv(self):
         try:
             process_data.save_to_csv(self)
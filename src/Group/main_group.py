@@ -1,8 +1,10 @@
 from PyQt5.QtWidgets import QApplication
+import multiprocessing
 import sys
 from Group.layout_group import GroupModule
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     ex = GroupModule()
     ex.show()
@@ -0,0 +1,86 @@
+import pandas as pd
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+METADATA_COLUMNS = ["Isolate", "ID", "Organism", "Length", "Host", "Geo Location", "Collection Date"]
+# Highly repetitive text columns are stored as categoricals: one string per distinct value
+CATEGORICAL_COLUMNS = ["Organism", "Host", "Geo Location", "Collection Date", "Group"]
+
+
+def metadata_frame(records):
+    """Build the columnar SeqGrouper store from parsed record dicts."""
+    columns = METADATA_COLUMNS + (["Group"] if any("Group" in record for record in records) else [])
+    frame = pd.DataFrame.from_records(records, columns=columns)
+    frame["Length"] = pd.to_numeric(frame["Length"], errors="coerce").fillna(0).astype("int64")
+    for name in columns:
+        if name == "Length":
+            continue
+        values = frame[name].fillna("N/A").astype(str)
+        frame[name] = values.astype("category") if name in CATEGORICAL_COLUMNS else values
+    return frame
+
+
+class MetadataTableModel(QAbstractTableModel):
+    """Qt view onto a metadata DataFrame; cells are rendered on demand instead of held as items."""
+
+    def __init__(self, frame=None, parent=None):
+        super().__init__(parent)
+        self.frame = frame if frame is not None else pd.DataFrame(columns=METADATA_COLUMNS)
+
+    def set_frame(self, frame):
+        self.beginResetModel()
+        self.frame = frame
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.frame)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.frame.columns)
+
+    def column_name(self, column):
+        return str(self.frame.columns[column]) if 0 <= column < len(self.frame.columns) else f"Column {column}"
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return str(self.frame.iat[index.row(), index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.column_name(section)
+        return str(section + 1)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        name = self.frame.columns[index.column()]
+        column = self.frame[name]
+        if name == "Length":
+            try:
+                value = int(value)
+            except ValueError:
+                return False
+        elif isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+            self.frame[name] = column.cat.add_categories([value])
+        self.frame.iat[index.row(), index.column()] = value
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def set_column(self, name, values):
+        """Replace or append a whole column, e.g. the Group column written by preview_groups."""
+        if name in self.frame.columns:
+            self.frame[name] = values
+            column = self.frame.columns.get_loc(name)
+            self.dataChanged.emit(self.index(0, column), self.index(len(self.frame) - 1, column))
+        else:
+            column = len(self.frame.columns)
+            self.beginInsertColumns(QModelIndex(), column, column)
+            self.frame[name] = values
+            self.endInsertColumns()
@@ -0,0 +1,106 @@
+import math
+import time
+
+# Flatfile bytes per base (60 bases per 76-character ORIGIN line) plus header/feature table per record
+GENBANK_BYTES_PER_BASE = 76 / 60
+GENBANK_RECORD_OVERHEAD = 3000
+FASTA_BYTES_PER_BASE = 61 / 60
+FASTA_RECORD_OVERHEAD = 120
+SUMMARY_BYTES_PER_RECORD = 1500
+# Assumed NCBI throughput once a request is being served, and its fixed turnaround
+TRANSFER_BYTES_PER_SECOND = 2 * 1024 ** 2
+REQUEST_LATENCY = 1.5
+# Keep each response small enough to retry cheaply, within the limits efetch accepts
+TARGET_RESPONSE_BYTES = 20 * 1024 ** 2
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 10000
+
+
+class HarvestEstimate:
+    """Projected cost of fetching `count` records in `batch_size` batches at `rate` requests/s."""
+
+    def __init__(self, count, mean_length, sampled, rettype="gb", batch_size=500, rate=3, workers=3):
+        self.count = count
+        self.mean_length = mean_length
+        self.sampled = sampled
+        self.rettype = rettype
+        self.batch_size = batch_size
+        self.rate = rate
+        self.workers = workers
+
+    @property
+    def bytes_per_record(self):
+        if self.rettype == "gb":
+            return self.mean_length * GENBANK_BYTES_PER_BASE + GENBANK_RECORD_OVERHEAD
+        if self.rettype == "fasta":
+            return self.mean_length * FASTA_BYTES_PER_BASE + FASTA_RECORD_OVERHEAD
+        return SUMMARY_BYTES_PER_RECORD
+
+    @property
+    def total_bytes(self):
+        return int(self.count * self.bytes_per_record)
+
+    def batches(self, batch_size=None):
+        return math.ceil(self.count / (batch_size or self.batch_size)) if self.count else 0
+
+    def duration(self, batch_size=None):
+        """Seconds for all batches: bounded below by the rate limit and by per-request transfer time."""
+        batches = self.batches(batch_size)
+        if not batches:
+            return 0.0
+        per_request = REQUEST_LATENCY + (batch_size or self.batch_size) * self.bytes_per_record / \
+            TRANSFER_BYTES_PER_SECOND
+        return max(batches / self.rate, batches * per_request / max(self.workers, 1))
+
+    @property
+    def recommended_batch_size(self):
+        size = int(TARGET_RESPONSE_BYTES // max(self.bytes_per_record, 1))
+        size = max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, size // 100 * 100))
+        return min(size, max(MIN_BATCH_SIZE, self.count))
+
+    def summary(self):
+        recommended = self.recommended_batch_size
+        return "\n".join([
+            f"Records: {self.count:,} (mean length {self.mean_length:,.0f} bp from {self.sampled} summaries)",
+            f"Estimated transfer ({self.rettype}): {format_bytes(self.total_bytes)}",
+            f"Batches of {self.batch_size}: {self.batches():,}, projected duration "
+            f"{format_duration(self.duration())} at {self.rate} requests/s",
+            f"Recommended batch size: {recommended} ({self.batches(recommended):,} batches, "
+            f"{format_duration(self.duration(recommended))})",
+        ])
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_duration(seconds):
+    return time.strftime("%H:%M:%S", time.gmtime(seconds)) if seconds < 86400 else f"{seconds / 86400:.1f} days"
+
+
+def summary_lengths(client, ids=None, webenv=None, query_key=None, sample_size=500):
+    """Sequence lengths (Slen) of up to `sample_size` records from one esummary call."""
+    if ids is not None:
+        if not ids:
+            return []
+        step = max(1, len(ids) // sample_size)
+        params = dict(db="nuccore", id=",".join(ids[::step][:sample_size]), version="2.0")
+    else:
+        params = dict(db="nuccore", webenv=webenv, query_key=query_key, retstart=0, retmax=sample_size,
+                      version="2.0")
+    summary = client.esummary(**params)
+    return [int(docsum.get("Slen") or 0)
+            for docsum in summary.get("DocumentSummarySet", {}).get("DocumentSummary", [])]
+
+
+def estimate_harvest(client, count, ids=None, webenv=None, query_key=None, rettype="gb", batch_size=500,
+                     sample_size=500):
+    """Estimate a harvest of `count` records from a length sample of the id list or history query."""
+    lengths = summary_lengths(client, ids=ids, webenv=webenv, query_key=query_key, sample_size=sample_size) \
+        if count else []
+    mean_length = sum(lengths) / len(lengths) if lengths else 0
+    return HarvestEstimate(count, mean_length, len(lengths), rettype=rettype, batch_size=batch_size,
+                           rate=client.rate, workers=client.max_workers)
@@ -0,0 +1,101 @@
+import os
+import re
+import threading
+import unicodedata
+
+import pandas as pd
+
+# Spellings seen in GenBank geo_loc_name / metadata tables -> the name used in Mapping.txt
+DEFAULT_ALIASES = {
+    "united states": "usa",
+    "united states of america": "usa",
+    "us": "usa",
+    "uk": "united kingdom",
+    "great britain": "united kingdom",
+    "england": "united kingdom",
+    "scotland": "united kingdom",
+    "wales": "united kingdom",
+    "viet nam": "vietnam",
+    "czechia": "czech republic",
+    "turkiye": "turkey",
+    "swaziland": "eswatini",
+    "burma": "myanmar",
+    "russian federation": "russia",
+    "republic of korea": "south korea",
+    "ivory coast": "cote d'ivoire",
+    "cabo verde": "cape verde",
+    "east timor": "timor-leste",
+    "drc": "democratic republic of the congo",
+}
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_location(value):
+    """Comparison key for a location: country part of 'Country: region', no accents, case, spaces or punctuation."""
+    value = str(value).split(":")[0]
+    value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM.sub("", value.casefold())
+
+
+class LocationMapping:
+    """Location -> region index from a Mapping.txt table (one 'region<TAB>location' pair per line)."""
+
+    def __init__(self, pairs, aliases=None):
+        self.index = {}
+        self.regions = []
+        for region, location in pairs:
+            self.index[normalize_location(location)] = region
+            if region not in self.regions:
+                self.regions.append(region)
+        self.aliases = {normalize_location(k): normalize_location(v)
+                        for k, v in (DEFAULT_ALIASES if aliases is None else aliases).items()}
+
+    def __len__(self):
+        return len(self.index)
+
+    def lookup(self, location, default=None):
+        key = normalize_location(location)
+        region = self.index.get(key)
+        if region is None and key in self.aliases:
+            region = self.index.get(self.aliases[key])
+        return default if region is None else region
+
+    def map_series(self, locations, default="Unknown"):
+        """Regions for a whole column; each distinct location is normalized once, then mapped in one pass."""
+        locations = pd.Series(locations)
+        table = {location: self.lookup(location, default) for location in pd.unique(locations)}
+        return locations.map(table).fillna(default)
+
+
+def read_mapping_pairs(path):
+    pairs = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            parts = line.split("\t", 1) if "\t" in line else line.split(None, 1)
+            if len(parts) != 2:
+                raise ValueError(f"{path}, line {line_number}: expected group and value separated by a tab")
+            pairs.append((parts[0].strip(), parts[1].strip()))
+    return pairs
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_mapping(path, aliases=None):
+    """Shared LocationMapping for `path`; re-read only when the file's mtime or size changes."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size, id(aliases) if aliases is not None else None)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+    mapping = LocationMapping(read_mapping_pairs(path), aliases)
+    with _cache_lock:
+        _cache[path] = (stamp, mapping)
+    return mapping
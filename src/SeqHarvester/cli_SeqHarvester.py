@@ -0,0 +1,131 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from Bio import Entrez
+
+from Entrez_client import EntrezClient
+from SeqHarvester.core_SeqHarvester import VirusSurvey, SequenceExporter, merge_similar_fragments
+from SeqHarvester.rules_SeqHarvester import load_rules
+
+TABLE_COLUMNS = ["type", "count", "percentage", "description"]
+
+
+def virus_output_dir(outdir, virus_name):
+    return os.path.join(outdir, re.sub(r"[^A-Za-z0-9]+", "_", virus_name).strip("_") or "virus")
+
+
+def write_table(path_prefix, table_data, formats):
+    if "tsv" in formats:
+        with open(path_prefix + ".tsv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter="\t")
+            writer.writerow(TABLE_COLUMNS)
+            writer.writerows(table_data)
+    if "json" in formats:
+        with open(path_prefix + ".json", "w", encoding="utf-8") as f:
+            json.dump([dict(zip(TABLE_COLUMNS, row)) for row in table_data], f, indent=1)
+
+
+def harvest(virus_name, myargs, rules=None):
+    """Survey one virus and write its classification table, type index and requested FASTA files.
+
+    Returns (output directory, record count), or (estimate summary, record count) with --dry-run.
+    """
+    prefix = f"[{virus_name}] "
+    client = EntrezClient(api_key=myargs.api_key, email=myargs.email)
+    survey = VirusSurvey(virus_name, use_history=myargs.history, incremental=myargs.incremental,
+                         use_taxid=myargs.taxid, include_title=not myargs.no_title, client=client, rules=rules,
+                         status_callback=lambda message: logging.info(prefix + re.sub(r"<[^>]+>", "", message)))
+    if myargs.dry_run:
+        estimate = survey.estimate()
+        if estimate is None:
+            raise RuntimeError("no records to estimate")
+        return estimate.summary(), estimate.count
+    result = survey.run_local(myargs.local, workers=myargs.workers) if myargs.local else survey.run()
+    if result is None:
+        raise RuntimeError("taxonomy query failed")
+    table_data, similar_groups, type_to_ids = result
+    if myargs.merge and any(len(keys) > 1 for keys in similar_groups.values()):
+        table_data, type_to_ids = merge_similar_fragments(table_data, similar_groups, type_to_ids)
+
+    output_dir = virus_output_dir(myargs.outdir, virus_name)
+    os.makedirs(output_dir, exist_ok=True)
+    write_table(os.path.join(output_dir, "classification"), table_data, myargs.format)
+    with open(os.path.join(output_dir, "type_to_ids.json"), "w", encoding="utf-8") as f:
+        json.dump(type_to_ids, f, indent=1)
+
+    exporter = SequenceExporter(output_dir, client=client,
+                                status_callback=lambda message: logging.info(prefix + message))
+    if myargs.all_sequences and survey.sequence_ids:
+        exporter.export_accessions(survey.sequence_ids)
+    if myargs.types:
+        selected = list(type_to_ids) if myargs.types == ["all"] else [t.strip().lower() for t in myargs.types]
+        exporter.export_types(selected, type_to_ids)
+    return output_dir, len(survey.sequence_ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m SeqHarvester.cli_SeqHarvester",
+        description="Headless SeqHarvester: survey GenBank records of one or more viruses, classify them "
+                    "by gene/segment and export tables and FASTA files without the GUI.")
+    parser.add_argument("viruses", nargs="*", help="Virus name(s) to survey")
+    parser.add_argument("-o", "--outdir", default=".", help="Output directory (one sub-directory per virus)")
+    parser.add_argument("--format", nargs="+", choices=["tsv", "json"], default=["tsv", "json"],
+                        help="Classification table format(s)")
+    parser.add_argument("--merge", action="store_true",
+                        help="Combine similar fragments (e.g. p24 / p24k) into a single type")
+    parser.add_argument("--types", nargs="+",
+                        help="Write one FASTA file per listed type ('all' for every type)")
+    parser.add_argument("--all-sequences", action="store_true",
+                        help="Write every surveyed sequence to accession_sequences.fasta")
+    parser.add_argument("--history", action="store_true", help="Page records through the Entrez history server")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch records added since the previous survey of the same query")
+    parser.add_argument("--taxid", action="store_true", help="Search by taxonomy ID instead of free text")
+    parser.add_argument("--no-title", action="store_true",
+                        help="With --taxid, do not add the virus name as a [Title] search")
+    parser.add_argument("--local", nargs="+", metavar="PATH",
+                        help="Classify local GenBank flatfiles (.gb, .gb.gz) or NCBI Virus data packages "
+                             "(data_report.jsonl or its directory) instead of searching NCBI")
+    parser.add_argument("--workers", type=int, help="Processes used to classify local files (default: all CPUs)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only report record count, transfer size, batches and projected duration")
+    parser.add_argument("--rules", help="JSON classification rules table (cp_keywords, aliases, ...)")
+    parser.add_argument("--api-key", help="NCBI API key (raises the rate limit to 10 requests/s)")
+    parser.add_argument("--email", help="Contact e-mail sent to NCBI")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Viruses surveyed concurrently; all share the NCBI rate limit")
+    myargs = parser.parse_args(sys.argv[1:])
+    if myargs.local:
+        myargs.viruses = myargs.viruses[:1] or [os.path.basename(myargs.local[0].rstrip("/\\"))]
+    elif not myargs.viruses:
+        parser.error("give at least one virus name, or --local files")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if myargs.email:
+        Entrez.email = myargs.email
+    if myargs.api_key:
+        Entrez.api_key = myargs.api_key
+
+    rules = load_rules(myargs.rules) if myargs.rules else None
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, myargs.jobs)) as pool:
+        futures = {pool.submit(harvest, virus_name, myargs, rules): virus_name for virus_name in myargs.viruses}
+        for future in as_completed(futures):
+            virus_name = futures[future]
+            try:
+                result, count = future.result()
+                if myargs.dry_run:
+                    print(f"{virus_name}:\n{result}")
+                else:
+                    print(f"{virus_name}: {count} sequences -> {result}")
+            except Exception as e:
+                failed += 1
+                print(f"{virus_name}: failed ({str(e)})", file=sys.stderr)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,654 @@
+import io
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from Bio import Entrez, SeqIO
+
+from Entrez_client import EntrezClient
+from Fetch_checkpoint import FetchCheckpoint, run_signature
+from Genbank_cache import get_shared_cache, record_key, split_genbank_records, strip_version
+from Genbank_scan import iter_file_chunks, scan_record, record_to_fasta
+from Harvest_estimate import estimate_harvest
+from SeqHarvester.local_SeqHarvester import data_report_fields, load_annotation_map, resolve_local_inputs
+from SeqHarvester.rules_SeqHarvester import default_rules
+from SeqHarvester.manifest_SeqHarvester import load_survey_manifest, save_survey_manifest, survey_checkpoint_path
+
+Entrez.email = "your.email@example.com"
+
+NO_DATA_ROW = ["no data", 0, "0%", "Unavailable sequence"]
+_SIZE_SUFFIX = re.compile(r'(k|kda)$')
+
+
+class VirusSurvey:
+    """Qt-free SeqHarvester survey: search, fetch and classify all GenBank records of a virus.
+
+    Progress and status messages go to the optional callbacks, and partial_callback receives the
+    classification table so far after each batch (at most once per partial_interval seconds).
+    run() returns (table_data, similar_groups, type_to_ids), or None when the taxonomy lookup fails.
+    """
+
+    def __init__(self, virus_name, use_history=False, incremental=False, use_taxid=False, include_title=True,
+                 entrez=None, client=None, status_callback=None, progress_callback=None, rules=None,
+                 partial_callback=None, partial_interval=0.3):
+        self.virus_name = virus_name
+        self.rules = rules or default_rules()
+        self.use_taxid = use_taxid
+        self.include_title = include_title
+        self.taxon_id = None
+        self.use_history = use_history and not incremental
+        self.incremental = incremental
+        self.entrez = entrez
+        self._client = client
+        self.status_callback = status_callback
+        self.progress_callback = progress_callback
+        self.partial_callback = partial_callback
+        self.partial_interval = partial_interval
+        self._last_partial = 0.0
+        self.cancelled = False
+        self.sequence_ids = []
+        self.type_to_ids = {}
+
+    @property
+    def client(self):
+        """Entrez client, created on first network use so local classification never builds one."""
+        if self._client is None:
+            self._client = EntrezClient(entrez=self.entrez)
+        return self._client
+
+    def cancel(self):
+        """Stop after the batch in progress; run() then returns the table built so far."""
+        self.cancelled = True
+
+    def report_partial(self):
+        if not self.partial_callback:
+            return
+        now = time.monotonic()
+        if now - self._last_partial < self.partial_interval:
+            return
+        self._last_partial = now
+        self.partial_callback(self.build_table()[0])
+
+    def report_status(self, message):
+        if self.status_callback:
+            self.status_callback(message)
+        else:
+            logging.info(re.sub(r"<[^>]+>", "", message))
+
+    def report_progress(self, current, total):
+        if self.progress_callback:
+            self.progress_callback(current, total)
+
+    def run(self):
+        self.report_status("Querying...")
+
+        taxon_id, _ = self.get_taxon_info()
+        if not taxon_id:
+            self.report_status("<span style='color: red;'>Taxonomy query failed</span>")
+            return None
+        self.taxon_id = taxon_id
+        if self.use_taxid:
+            self.report_query_counts()
+
+        if self.use_history:
+            total, webenv, query_key = self.search_history()
+        else:
+            self.sequence_ids = self.search_sequences()
+            total = len(self.sequence_ids)
+        if not total:
+            self.report_status("<span style='color: red;'>No related sequences found</span>")
+            return [list(NO_DATA_ROW)], {}, {}
+
+        self.reset_classification()
+        self.failed_batches = 0
+        all_ids = self.sequence_ids
+        if self.use_history:
+            checkpoint = FetchCheckpoint(survey_checkpoint_path(self.search_term()),
+                                         run_signature("history", self.search_term(), total))
+            self.verify_history_checkpoint(checkpoint, total, webenv, query_key)
+            self.sequence_ids = []
+            batches = self.iter_history_records(total, webenv, query_key, checkpoint)
+        else:
+            if self.incremental:
+                self.sequence_ids = self.reuse_previous_survey(all_ids)
+            checkpoint = FetchCheckpoint(survey_checkpoint_path(self.search_term()),
+                                         run_signature("ids", self.search_term(), self.sequence_ids))
+            batches = self.iter_records(len(self.sequence_ids), checkpoint)
+        if checkpoint.done:
+            self.report_status(f"Resuming from checkpoint: {len(checkpoint.done)} batches already completed")
+            for payload in checkpoint.done.values():
+                for seq_id, contributions in payload.items():
+                    self.replay_contributions(seq_id, contributions)
+                    if self.use_history:
+                        self.sequence_ids.append(seq_id)
+        for batch_idx, batch_records in batches:
+            batch_ids = []
+            for record_str in batch_records:
+                seq_id = self.classify_record(record_str)
+                if seq_id:
+                    batch_ids.append(seq_id)
+            if self.use_history:
+                self.sequence_ids.extend(batch_ids)
+            checkpoint.mark_done(batch_idx, {seq_id: self.contributions.get(seq_id, []) for seq_id in batch_ids},
+                                 [record_key(r) for r in batch_records] if self.use_history else None)
+            if self.cancelled:
+                break
+            self.report_partial()
+        if self.cancelled:
+            self.report_status(
+                "<span style='color: red;'>Search stopped; search again to resume from the checkpoint.</span>")
+        elif self.failed_batches:
+            self.report_status(
+                f"<span style='color: red;'>{self.failed_batches} batches failed; "
+                f"search again to resume from the checkpoint.</span>")
+        else:
+            checkpoint.clear()
+        if not self.use_history and not self.cancelled:
+            self.sequence_ids = all_ids
+            save_survey_manifest(self.search_term(), all_ids, self.contributions)
+        table_data, similar_groups = self.build_table()
+
+        missing_count = next((item[1] for item in table_data if item[0] == "missing"), 0)
+        self.report_status(
+            f"Data retrieval completed, {missing_count} sequences found to have missing information.")
+        return table_data, similar_groups, self.type_to_ids
+
+    def estimate(self, sample_size=500):
+        """Dry run: count the records a survey would fetch and project transfer size and duration."""
+        self.report_status("Estimating...")
+        taxon_id, _ = self.get_taxon_info()
+        if not taxon_id:
+            self.report_status("<span style='color: red;'>Taxonomy query failed</span>")
+            return None
+        self.taxon_id = taxon_id
+        total, webenv, query_key = self.search_history()
+        if not total:
+            self.report_status("<span style='color: red;'>No related sequences found</span>")
+            return None
+        try:
+            estimate = estimate_harvest(self.client, total, webenv=webenv, query_key=query_key,
+                                        sample_size=sample_size)
+        except Exception as e:
+            logging.error(f"Estimate failed: {str(e)}")
+            self.report_status(f"<span style='color: red;'>Estimate failed: {str(e)}</span>")
+            return None
+        self.report_status(estimate.summary().replace("\n", "<br>"))
+        return estimate
+
+    def run_local(self, paths, workers=None, cache_records=True):
+        """Classify local GenBank flatfiles and NCBI Virus data reports without network access.
+
+        Files are cut into blocks at record boundaries and classified across a process pool;
+        GenBank records are also stored in the shared cache so later FASTA exports stay offline.
+        Returns (table_data, similar_groups, type_to_ids) like run().
+        """
+        inputs = resolve_local_inputs(paths)
+        total_bytes = sum(os.path.getsize(path) for _, path in inputs)
+        if not total_bytes:
+            self.report_status("<span style='color: red;'>No local records found</span>")
+            return [list(NO_DATA_ROW)], {}, {}
+        self.report_status(f"Classifying {len(inputs)} local file(s), {total_bytes / 1024 ** 2:.0f} MB...")
+        self.reset_classification()
+        self.sequence_ids = []
+        cache = get_shared_cache() if cache_records else None
+        workers = workers or os.cpu_count() or 1
+        pending = deque()
+        done_bytes = 0
+
+        def collect():
+            future, kind, text, consumed = pending.popleft()
+            for seq_id, contributions in future.result():
+                self.sequence_ids.append(seq_id)
+                self.replay_contributions(seq_id, contributions)
+            if cache and kind == "genbank":
+                cache.put_many(split_genbank_records(text))
+            self.report_progress(consumed // 1024, total_bytes // 1024)
+            self.report_partial()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for kind, path in inputs:
+                if self.cancelled:
+                    break
+                for position, text in iter_file_chunks(path, "genbank" if kind == "genbank" else "lines"):
+                    if self.cancelled:
+                        break
+                    pending.append((pool.submit(classify_local_chunk, kind, path, text, self.rules), kind,
+                                    text if cache else None, done_bytes + position))
+                    if len(pending) >= 2 * workers:
+                        collect()
+                done_bytes += os.path.getsize(path)
+            while pending:
+                collect()
+
+        table_data, similar_groups = self.build_table()
+        self.report_status(f"Local classification completed: {len(self.sequence_ids)} records.")
+        return table_data, similar_groups, self.type_to_ids
+
+    def get_taxon_info(self):
+        try:
+            record = self.client.esearch(db="taxonomy", term=self.virus_name)
+            taxon_id = record["IdList"][0] if record["IdList"] else None
+            return taxon_id, None
+        except Exception as e:
+            logging.error(f"Taxonomy query failed: {str(e)}")
+            self.report_status(f"<span style='color: red;'>Taxonomy query failed: {str(e)}</span>")
+            return None, None
+
+    def search_term(self):
+        if self.use_taxid and self.taxon_id:
+            term = f"txid{self.taxon_id}[Organism:exp]"
+            if self.include_title:
+                term += f" OR {self.virus_name}[Title]"
+            return term
+        return f"{self.virus_name}[Organism] OR {self.virus_name}[Title]"
+
+    def query_variants(self):
+        variants = {
+            "Name (Organism OR Title)": f"{self.virus_name}[Organism] OR {self.virus_name}[Title]",
+            "Name (Organism only)": f"{self.virus_name}[Organism]",
+        }
+        if self.taxon_id:
+            variants[f"txid{self.taxon_id} (Organism:exp)"] = f"txid{self.taxon_id}[Organism:exp]"
+            variants[f"txid{self.taxon_id} OR Title"] = f"txid{self.taxon_id}[Organism:exp] OR {self.virus_name}[Title]"
+        return variants
+
+    def report_query_counts(self):
+        """Emit how many records each query variant matches, using count-only esearch calls."""
+        counts = {}
+        for label, term in self.query_variants().items():
+            try:
+                record = self.client.esearch(db="nucleotide", term=term, retmax=0)
+                counts[label] = int(record["Count"])
+            except Exception as e:
+                logging.error(f"Count query failed for {term}: {str(e)}")
+        if counts:
+            self.report_status("Records per query: " + "; ".join(f"{k}: {v}" for k, v in counts.items()))
+            self.report_status(f"Using query: {self.search_term()}")
+        return counts
+
+    def reuse_previous_survey(self, ids):
+        """Replay classifications saved for ids seen in the previous run; returns the ids still to fetch."""
+        manifest = load_survey_manifest(self.search_term())
+        if not manifest:
+            self.report_status("No previous survey found, running a full survey.")
+            return ids
+        previous = manifest["contributions"]
+        new_ids = []
+        for seq_id in ids:
+            if seq_id in previous:
+                self.replay_contributions(seq_id, previous[seq_id])
+            else:
+                new_ids.append(seq_id)
+        removed = len(previous.keys() - set(ids))
+        self.report_status(
+            f"Incremental update: {len(ids) - len(new_ids)} records reused, {len(new_ids)} new, "
+            f"{removed} no longer returned by NCBI.")
+        return new_ids
+
+    def search_sequences(self):
+        try:
+            ids = []
+            retmax = 10000
+            retstart = 0
+            while True:
+                record = self.client.esearch(db="nucleotide", term=self.search_term(),
+                                             retmax=retmax, retstart=retstart, idtype="acc")
+                ids.extend(record["IdList"])
+                retstart += retmax
+                if retstart >= int(record["Count"]):
+                    break
+            logging.info(f"Total number of sequences retrieved: {len(ids)}")
+            return ids
+        except Exception as e:
+            logging.error(f"Sequence retrieval failure: {str(e)}")
+            self.report_status(f"<span style='color: red;'>Sequence retrieval failure: {str(e)}</span>")
+            return []
+
+    def iter_records(self, total, checkpoint):
+        """Yield (batch index, GenBank record strings) for batches not yet in the checkpoint."""
+        batch_size = 500
+        cache = get_shared_cache()
+        pending = []
+        done = 0
+        from_cache = 0
+        for batch_idx, i in enumerate(range(0, total, batch_size)):
+            batch_ids = self.sequence_ids[i:i + batch_size]
+            if checkpoint.is_done(batch_idx):
+                done += len(batch_ids)
+                continue
+            cached = cache.get_many(batch_ids) if cache else {}
+            from_cache += len(cached)
+            missing_ids = [seq_id for seq_id in batch_ids if seq_id not in cached]
+            if missing_ids:
+                pending.append((batch_idx, batch_ids, missing_ids, cached))
+                continue
+            done += len(batch_ids)
+            self.report_progress(done, total)
+            yield batch_idx, list(cached.values())
+        logging.info(f"{from_cache} records served from local cache")
+
+        params = [dict(db="nucleotide", id=",".join(missing_ids), rettype="gb", retmode="text")
+                  for _, _, missing_ids, _ in pending]
+        for idx, text, error in self.client.efetch_many(params):
+            batch_idx, batch_ids, missing_ids, cached = pending[idx]
+            if error is not None:
+                self.failed_batches += 1
+                logging.error(f"Batch search failure: {str(error)}")
+                self.report_status(f"<span style='color: red;'>Batch search failure: {str(error)}</span>")
+                continue
+            batch_records = split_genbank_records(text)
+            if cache:
+                cache.put_many(batch_records)
+            # Hits read before the fetch: put_many may have evicted them to stay under the size cap
+            batch_records.extend(cached.values())
+            done += len(batch_ids)
+            self.report_progress(done, total)
+            yield batch_idx, batch_records
+
+    def search_history(self):
+        try:
+            record = self.client.esearch(db="nucleotide", term=self.search_term(),
+                                         usehistory="y", retmax=0)
+            total = int(record["Count"])
+            logging.info(f"Total number of sequences on history server: {total}")
+            return total, record["WebEnv"], record["QueryKey"]
+        except Exception as e:
+            logging.error(f"Sequence retrieval failure: {str(e)}")
+            self.report_status(f"<span style='color: red;'>Sequence retrieval failure: {str(e)}</span>")
+            return 0, None, None
+
+    def verify_history_checkpoint(self, checkpoint, total, webenv, query_key):
+        """Discard the checkpoint unless the history results still list the same accessions at each done batch.
+
+        Resumed batches are located by retstart, so a reordered result set of the same size would otherwise
+        duplicate some records and skip others. The check fetches accession lists only (rettype=acc).
+        """
+        if not checkpoint.done:
+            return
+        batch_size = 500
+        done = sorted(checkpoint.done)
+        params = [dict(db="nucleotide", webenv=webenv, query_key=query_key, retstart=batch_idx * batch_size,
+                       retmax=min(batch_size, total - batch_idx * batch_size), rettype="acc", retmode="text")
+                  for batch_idx in done]
+        reason = None
+        for idx, text, error in self.client.efetch_many(params):
+            stored = checkpoint.accessions.get(done[idx])
+            if error is not None:
+                reason = f"accession check failed ({str(error)})"
+            elif stored is None or [strip_version(acc or "") for acc in stored] != \
+                    [strip_version(acc) for acc in text.split()]:
+                reason = "search results changed since the checkpoint"
+            if reason:
+                break
+        if reason:
+            logging.info(f"Discarding history checkpoint: {reason}")
+            self.report_status(f"Discarding checkpoint: {reason}; starting over")
+            checkpoint.clear()
+
+    def iter_history_records(self, total, webenv, query_key, checkpoint):
+        batch_size = 500
+        cache = get_shared_cache()
+        starts = [(batch_idx, retstart) for batch_idx, retstart in enumerate(range(0, total, batch_size))
+                  if not checkpoint.is_done(batch_idx)]
+        done = total - sum(min(batch_size, total - retstart) for _, retstart in starts)
+        params = [dict(db="nucleotide", webenv=webenv, query_key=query_key, retstart=retstart,
+                       retmax=batch_size, rettype="gb", retmode="text")
+                  for _, retstart in starts]
+        for idx, text, error in self.client.efetch_many(params):
+            if error is not None:
+                self.failed_batches += 1
+                logging.error(f"Batch search failure: {str(error)}")
+                self.report_status(f"<span style='color: red;'>Batch search failure: {str(error)}</span>")
+                continue
+            batch_records = split_genbank_records(text)
+            if cache:
+                cache.put_many(batch_records)
+            done += len(batch_records)
+            self.report_progress(min(done, total), total)
+            yield starts[idx][0], batch_records
+
+    def normalize_name(self, name):
+        return self.rules.normalize_name(name)
+
+    def extract_from_definition(self, definition):
+        return self.rules.extract_from_definition(definition)
+
+    def reset_classification(self):
+        self.stats = {"Complete genome": 0, "missing": 0, "CP gene": 0}
+        self.descriptions = {}
+        self.similar_groups = {}
+        self.type_to_ids = {}
+        self.contributions = {}
+
+    def add_contribution(self, seq_id, key, desc, group_desc=None):
+        self.stats[key] = self.stats.get(key, 0) + 1
+        self.descriptions[key] = desc
+        self.type_to_ids.setdefault(key.lower(), []).append(seq_id)
+        if group_desc is not None:
+            self.similar_groups.setdefault(group_desc, []).append(key)
+        self.contributions.setdefault(seq_id, []).append((key, desc, group_desc))
+
+    def replay_contributions(self, seq_id, contributions):
+        for key, desc, group_desc in contributions:
+            self.add_contribution(seq_id, key, desc, group_desc)
+
+    def classify_record(self, record_str):
+        """Classify one GenBank record string into the running stats; returns its accession.version."""
+        try:
+            record = scan_record(record_str, feature_types=("CDS",))
+            cds = [(feature.qualifiers.get("gene", [""])[0], feature.qualifiers.get("product", [""])[0])
+                   for feature in record.features]
+            return self.classify_fields(record.id, record.description, cds)
+        except Exception as e:
+            logging.error(f"Parsing record failure: {str(e)}")
+            self.report_status(f"<span style='color: red;'>Parsing record failure: {str(e)}</span>")
+            return None
+
+    def classify_fields(self, seq_id, description, cds):
+        """Classify a record given its definition line and CDS (gene, product) pairs."""
+        rules = self.rules
+        definition = description.lower()
+        def_key = self.extract_from_definition(definition) or "unknown"
+
+        if rules.is_complete(definition):
+            self.add_contribution(seq_id, "Complete genome", definition)
+            return seq_id
+
+        if len(cds) == 0:
+            self.add_contribution(seq_id, "missing", definition)
+            return seq_id
+
+        is_cp_in_def = rules.has_cp_keyword(definition) or def_key.lower() == "cp"
+        for gene, product in cds:
+            key = self.normalize_name(gene or product) or def_key
+            desc = product or gene or definition
+
+            is_cp_in_cds = rules.has_cp_keyword(product.lower()) or key.lower() == "cp"
+            if is_cp_in_def and is_cp_in_cds:
+                self.add_contribution(seq_id, "CP gene", desc)
+            else:
+                self.add_contribution(seq_id, key, desc, desc.lower())
+        return seq_id
+
+    def build_table(self):
+        stats = self.stats
+        total = sum(stats.values())
+        if total == 0:
+            return [["no data", 0, "0%", "Unavailable sequence"]], {}
+        table_data = [
+            [k, v, f"{v / total * 100:.1f}%", self.descriptions.get(k, k)]
+            for k, v in stats.items() if v > 0
+        ]
+        return sorted(table_data, key=lambda x: x[1], reverse=True), self.similar_groups
+
+    def parse_records(self, records):
+        self.reset_classification()
+        for record_str in records:
+            self.classify_record(record_str)
+        return self.build_table()
+
+
+def classify_local_chunk(kind, path, text, rules=None):
+    """Process-pool worker: classify one block of a local file; returns [(accession, contributions)]."""
+    survey = VirusSurvey(os.path.basename(path), rules=rules)
+    survey.reset_classification()
+    if kind == "genbank":
+        seq_ids = [survey.classify_record(record_str) for record_str in split_genbank_records(text)]
+    else:
+        annotations = load_annotation_map(path)
+        seq_ids = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                seq_ids.append(survey.classify_fields(*data_report_fields(json.loads(line), annotations)))
+            except (ValueError, AttributeError) as e:
+                logging.error(f"Parsing report line failure: {str(e)}")
+    return [(seq_id, survey.contributions.get(seq_id, [])) for seq_id in dict.fromkeys(seq_ids) if seq_id]
+
+
+class SequenceExporter:
+    """Write FASTA files for classified types or an accession list, reusing cached GenBank records."""
+
+    def __init__(self, save_path, client=None, status_callback=None):
+        self.save_path = save_path
+        self.client = client or EntrezClient()
+        self.status_callback = status_callback
+
+    def report_status(self, message):
+        if self.status_callback:
+            self.status_callback(message)
+        else:
+            logging.info(re.sub(r"<[^>]+>", "", message))
+
+    def export_accessions(self, accession_ids):
+        self.report_status(f"Downloading {len(accession_ids)} sequences...")
+        written = self.export_fasta({"accession_sequences.fasta": accession_ids})
+        # Save accession IDs to text file
+        accession_ids = [strip_version(seq_id) for seq_id in written["accession_sequences.fasta"]]
+        with open(os.path.join(self.save_path, "accession_ids.txt"), "w") as f:
+            f.write("\n".join(sorted(set(accession_ids))))
+        self.report_status("Accession IDs saved to accession_ids.txt")
+        return written
+
+    def export_types(self, selected_types, type_to_ids):
+        logging.info(f"Selected types for download: {selected_types}")
+        logging.info(f"Available type_to_ids keys: {list(type_to_ids.keys())}")
+
+        groups = {}
+        for typ in selected_types:
+            ids = type_to_ids.get(typ, [])
+            if not ids:
+                self.report_status(f"Skipping {typ}: No sequences found.")
+                logging.warning(f"No sequences found for type '{typ}'")
+                continue
+            groups[f"{safe_file_name(typ)}.fasta"] = ids
+        written = self.export_fasta(groups)
+
+        all_selected_ids = []
+        for file_name, seq_ids in written.items():
+            type_accession_ids = [strip_version(seq_id) for seq_id in seq_ids]
+            all_selected_ids.extend(type_accession_ids)
+            self.report_status(
+                f"Saved {len(type_accession_ids)} accession IDs for {file_name[:-len('.fasta')]}")
+
+        if all_selected_ids:
+            with open(os.path.join(self.save_path, "accession_numbers.txt"), "w") as f:
+                f.write("\n".join(sorted(set(all_selected_ids))))
+            self.report_status("Accession IDs for selected types saved to accession_numbers.txt")
+        return written
+
+    def export_fasta(self, groups):
+        """Stream FASTA for {output file name: ids} to disk; returns {file name: ids written}.
+
+        Each accession is rendered once from the GenBank cache; only the union of ids missing from
+        the cache is fetched from NCBI, in batches.
+        """
+        id_to_files = {}
+        for file_name, ids in groups.items():
+            for seq_id in ids:
+                id_to_files.setdefault(seq_id, []).append(file_name)
+                id_to_files.setdefault(strip_version(seq_id), []).append(file_name)
+        unique_ids = list(dict.fromkeys(seq_id for ids in groups.values() for seq_id in ids))
+        written = {file_name: [] for file_name in groups}
+        handles = {file_name: open(os.path.join(self.save_path, file_name), "w") for file_name in groups}
+        try:
+            def write(seq_id, fasta):
+                targets = id_to_files.get(seq_id) or id_to_files.get(strip_version(seq_id), [])
+                for file_name in dict.fromkeys(targets):
+                    handles[file_name].write(fasta)
+                    written[file_name].append(seq_id)
+
+            cache = get_shared_cache()
+            missing_ids = []
+            batch_size = 500
+            for i in range(0, len(unique_ids), batch_size):
+                batch_ids = unique_ids[i:i + batch_size]
+                cached = cache.get_many(batch_ids) if cache else {}
+                for seq_id in batch_ids:
+                    fasta = record_to_fasta(cached[seq_id]) if seq_id in cached else None
+                    if fasta is None:
+                        missing_ids.append(seq_id)
+                    else:
+                        write(seq_id, fasta)
+            self.report_status(
+                f"{len(unique_ids) - len(missing_ids)} sequences written from local cache, "
+                f"{len(missing_ids)} to download")
+
+            batches = [missing_ids[i:i + batch_size] for i in range(0, len(missing_ids), batch_size)]
+            params = [dict(db="nucleotide", id=",".join(batch), rettype="fasta", retmode="text")
+                      for batch in batches]
+            for idx, text, error in self.client.efetch_many(params):
+                if error is not None:
+                    raise error
+                for sequence in SeqIO.parse(io.StringIO(text), "fasta"):
+                    write(sequence.id, sequence.format("fasta"))
+                self.report_status(f"Downloaded batch {idx + 1}/{len(batches)}")
+        finally:
+            for handle in handles.values():
+                handle.close()
+        return written
+
+
+def safe_file_name(name):
+    return re.sub(r'[\\/:*?"<>|]+', "_", name).strip() or "unnamed"
+
+
+def count_similar_groups(similar_groups):
+    return sum(1 for keys in similar_groups.values() if len(keys) > 1)
+
+
+def merge_similar_fragments(table_data, similar_groups, type_to_ids):
+    """Combine rows whose type differs only by a k/kDa suffix and share a description group.
+
+    Base keys and per-key totals are indexed in one pass, so the merge is linear in the number of rows.
+    """
+    base_keys = [_SIZE_SUFFIX.sub("", row[0].lower()) for row in table_data]
+    grand_total = sum(row[1] for row in table_data)
+    totals = {}
+    for base_key, row in zip(base_keys, table_data):
+        totals[base_key] = totals.get(base_key, 0) + row[1]
+
+    new_table_data = []
+    processed_keys = set()
+    new_type_to_ids = {}
+    for base_key, row in zip(base_keys, table_data):
+        if base_key in processed_keys:
+            continue
+        processed_keys.add(base_key)
+        typ, num, perc, desc = row
+        if len(similar_groups.get(base_key, ())) > 1:
+            total_num = totals[base_key]
+            new_table_data.append([base_key, total_num, f"{total_num / grand_total * 100:.1f}%", desc])
+            ids = []
+            for k in similar_groups[base_key]:
+                ids.extend(type_to_ids.get(k.lower(), []))
+            new_type_to_ids[base_key] = ids
+        else:
+            new_table_data.append(row)
+            new_type_to_ids[typ.lower()] = type_to_ids.get(typ.lower(), [])
+    return new_table_data, new_type_to_ids
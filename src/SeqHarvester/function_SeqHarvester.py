@@ -2,15 +2,13 @@ import os
 from PyQt5.QtWidgets import (QTableWidgetItem, QMessageBox, QFileDialog, QComboBox)
 from PyQt5.QtCore import QThread, pyqtSignal, Qt
 from PyQt5.QtGui import QStandardItemModel, QStandardItem, QFont
-from Bio import Entrez, SeqIO
-import io
-import re
 from SeqHarvester.layout_SeqHarvester import VirusAnalysisUI
+from SeqHarvester.core_SeqHarvester import (VirusSurvey, SequenceExporter, count_similar_groups,
+                                            merge_similar_fragments)
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-Entrez.email = "your.email@example.com"
 
 class CheckableComboBox(QComboBox):
     def __init__(self):
@@ -88,49 +86,14 @@ class DownloadWorker(QThread):
         self.type_to_ids = type_to_ids or {}
         self.accession_ids = accession_ids
         self.save_path = save_path
+        self.exporter = SequenceExporter(save_path, status_callback=self.progress_update.emit)
+
     def run(self):
         try:
             if self.accession_ids:
-                self.progress_update.emit(f"Downloading {len(self.accession_ids)} sequences...")
-                # Fetch sequences
-                handle = Entrez.efetch(db="nucleotide", id=",".join(self.accession_ids), rettype="fasta",
-                                       retmode="text")
-                sequences = list(SeqIO.parse(handle, "fasta"))
-                # Save sequences to FASTA file
-                with open(os.path.join(self.save_path, "accession_sequences.fasta"), "w") as f:
-                    SeqIO.write(sequences, f, "fasta")
-                # Save accession IDs to text file
-                accession_ids = [seq.id.split('.')[0] for seq in sequences]  # Extract accession IDs without version
-                with open(os.path.join(self.save_path, "accession_ids.txt"), "w") as f:
-                    f.write("\n".join(sorted(set(accession_ids))))
-                self.progress_update.emit("Accession IDs saved to accession_ids.txt")
+                self.exporter.export_accessions(self.accession_ids)
             else:
-                logging.info(f"Selected types for download: {self.selected_types}")
-                logging.info(f"Available type_to_ids keys: {list(self.type_to_ids.keys())}")
-        
-                all_selected_ids = []
-                for typ in self.selected_types:
-                    ids = self.type_to_ids.get(typ, [])
-                    if not ids:
-                        self.progress_update.emit(f"Skipping {typ}: No sequences found.")
-                        logging.warning(f"No sequences found for type '{typ}'")
-                        continue
-                    self.progress_update.emit(f"Downloading {typ} ({len(ids)} sequences)...")
-       
-                    handle = Entrez.efetch(db="nucleotide", id=",".join(ids), rettype="fasta", retmode="text")
-                    sequences = list(SeqIO.parse(handle, "fasta"))
-                    with open(os.path.join(self.save_path, f"{typ}.fasta"), "w") as f:
-                        SeqIO.write(sequences, f, "fasta")
-            
-                    type_accession_ids = [seq.id.split('.')[0] for seq in
-                                          sequences] 
-                    all_selected_ids.extend(type_accession_ids)
-                    self.progress_update.emit(f"Saved {len(type_accession_ids)} accession IDs for {typ}")
-   
-                if all_selected_ids:
-                    with open(os.path.join(self.save_path, "accession_numbers.txt"), "w") as f:
-                        f.write("\n".join(sorted(set(all_selected_ids))))
-                    self.progress_update.emit("Accession IDs for selected types saved to accession_numbers.txt")
+                self.exporter.export_types(self.selected_types, self.type_to_ids)
 
             self.progress_update.emit("<span style='color: green'>All downloads completed successfully.</span>")
             self.finished.emit()
@@ -142,198 +105,58 @@ class DownloadWorker(QThread):
 class AnalysisWorker(QThread):
     progress_update = pyqtSignal(int, int)
     table_update = pyqtSignal(tuple)
+    partial_update = pyqtSignal(list)
     status_update = pyqtSignal(str)
 
-    def __init__(self, virus_name):
+    def __init__(self, virus_name, use_history=False, incremental=False, use_taxid=False, include_title=True,
+                 entrez=None, local_paths=None, dry_run=False):
         super().__init__()
-        self.virus_name = virus_name
-        self.sequence_ids = []
-        self.type_to_ids = {}
+        self.local_paths = local_paths
+        self.dry_run = dry_run
+        self.survey = VirusSurvey(virus_name, use_history=use_history, incremental=incremental,
+                                  use_taxid=use_taxid, include_title=include_title, entrez=entrez,
+                                  status_callback=self.status_update.emit,
+                                  progress_callback=self.progress_update.emit,
+                                  partial_callback=self.partial_update.emit)
 
-    def run(self):
-        self.status_update.emit("Querying...")
+    def cancel(self):
+        self.survey.cancel()
 
-        taxon_id, _ = self.get_taxon_info()
-        if not taxon_id:
-            self.status_update.emit("<span style='color: red;'>Taxonomy query failed</span>")
-            return
+    @property
+    def sequence_ids(self):
+        return self.survey.sequence_ids
+
+    @property
+    def type_to_ids(self):
+        return self.survey.type_to_ids
 
-        self.sequence_ids = self.search_sequences()
-        if not self.sequence_ids:
-            self.status_update.emit("<span style='color: red;'>No related sequences found</span>")
-            self.table_update.emit(([["no data", 0, "0%", "Unavailable sequence"]], {}, {}))
+    def run(self):
+        if self.dry_run:
+            self.survey.estimate()
             return
+        if self.local_paths:
+            result = self.survey.run_local(self.local_paths)
+        else:
+            result = self.survey.run()
+        if result is not None:
+            self.table_update.emit(result)
 
-        total = len(self.sequence_ids)
-        records = self.fetch_records(total)
-        table_data, similar_groups = self.parse_records(records)
-        self.table_update.emit((table_data, similar_groups, self.type_to_ids))
 
-        missing_count = next((item[1] for item in table_data if item[0] == "missing"), 0)
-        self.status_update.emit(
-            f"Data retrieval completed, {missing_count} sequences found to have missing information.")
+class MergeWorker(QThread):
+    merged = pyqtSignal(tuple)
+    error = pyqtSignal(str)
 
-    def get_taxon_info(self):
-        try:
-            handle = Entrez.esearch(db="taxonomy", term=self.virus_name)
-            record = Entrez.read(handle)
-            taxon_id = record["IdList"][0] if record["IdList"] else None
-            return taxon_id, None
-        except Exception as e:
-            logging.error(f"Taxonomy query failed: {str(e)}")
-            self.status_update.emit(f"<span style='color: red;'>Taxonomy query failed: {str(e)}</span>")
-            return None, None
+    def __init__(self, table_data, similar_groups, type_to_ids):
+        super().__init__()
+        self.table_data = table_data
+        self.similar_groups = similar_groups
+        self.type_to_ids = type_to_ids
 
-    def search_sequences(self):
+    def run(self):
         try:
-            ids = []
-            retmax = 10000
-            retstart = 0
-            while True:
-                handle = Entrez.esearch(db="nucleotide",
-                                        term=f"{self.virus_name}[Organism] OR {self.virus_name}[Title]",
-                                        retmax=retmax, retstart=retstart)
-                record = Entrez.read(handle)
-                ids.extend(record["IdList"])
-                retstart += retmax
-                if retstart >= int(record["Count"]):
-                    break
-            logging.info(f"Total number of sequences retrieved: {len(ids)}")
-            return ids
+            self.merged.emit(merge_similar_fragments(self.table_data, self.similar_groups, self.type_to_ids))
         except Exception as e:
-            logging.error(f"Sequence retrieval failure: {str(e)}")
-            self.status_update.emit(f"<span style='color: red;'>Sequence retrieval failure: {str(e)}</span>")
-            return []
-
-    def fetch_records(self, total):
-        records = []
-        batch_size = 500
-        for i in range(0, total, batch_size):
-            batch_ids = self.sequence_ids[i:i + batch_size]
-            try:
-                handle = Entrez.efetch(db="nucleotide", id=",".join(batch_ids),
-                                       rettype="gb", retmode="text")
-                batch_records = handle.read().split("\n//\n")
-                records.extend(batch_records)
-                self.progress_update.emit(min(i + batch_size, total), total)
-            except Exception as e:
-                logging.error(f"Batch search failure: {str(e)}")
-                self.status_update.emit(f"<span style='color: red;'>Batch search failure: {str(e)}</span>")
-        return [r + "\n//\n" if not r.endswith("\n//\n") else r for r in records if r.strip()]
-
-    def normalize_name(self, name):
-        if not name:
-            return None
-        name = name.lower().strip()
-        name = re.sub(r'\([^()]*\)', '', name).strip()
-        name = re.sub(r'\b(protein|viral|genome-linked|with|activity|gene)\b', '', name).strip()
-        match = re.match(r'^(?:[a-z]+-)?[a-z0-9]+', name)
-        if match:
-            return match.group(0).title()
-        words = name.split()
-        return words[0].title() if words else name.title()
-
-    def extract_from_definition(self, definition):
-        definition = definition.lower()
-        match = re.search(r'(\w+(?:-\w+)?)\s+gene', definition)
-        if match:
-            gene_name = match.group(1)
-            return self.normalize_name(gene_name)
-        return None
-
-    def parse_records(self, records):
-        stats = {"Complete genome": 0, "missing": 0, "CP gene": 0}
-        cp_keywords = ["capsid protein", "coat protein", "cp protein", "cp", "CP", "Cp", "coat protein-like"]
-        descriptions = {}
-        similar_groups = {}
-        self.type_to_ids = {}
-
-        for idx, record_str in enumerate(records):
-            try:
-                record = SeqIO.read(io.StringIO(record_str), "genbank")
-                definition = record.description.lower()
-                cds_features = [f for f in record.features if f.type == "CDS"]
-                cds_count = len(cds_features)
-                seq_id = self.sequence_ids[idx]
-
-                def_key = self.extract_from_definition(definition) or "unknown"
-
-                is_complete = ("complete genome" in definition or
-                               "complete sequence" in definition or
-                               "whole genome" in definition) and "partial" not in definition
-                if is_complete:
-                    stats["Complete genome"] += 1
-                    descriptions["Complete genome"] = definition
-                    self.type_to_ids.setdefault("Complete genome".lower(), []).append(seq_id)
-                    continue
-
-                if cds_count == 0:
-                    stats["missing"] += 1
-                    descriptions["missing"] = definition
-                    self.type_to_ids.setdefault("missing".lower(), []).append(seq_id)
-                    continue
-
-                found_segment = False
-                for feature in cds_features:
-                    gene = feature.qualifiers.get("gene", [""])[0]
-                    product = feature.qualifiers.get("product", [""])[0]
-                    if gene:
-                        key = self.normalize_name(gene)
-                    else:
-                        key = self.normalize_name(product)
-
-                    if not key:
-                        key = def_key
-
-                    found_segment = True
-                    desc = product or gene or definition
-
-                    is_cp_in_def = any(kw in definition for kw in cp_keywords) or def_key.lower() == "cp"
-                    is_cp_in_cds = any(kw in product.lower() for kw in cp_keywords) or key.lower() == "cp"
-                    if is_cp_in_def and is_cp_in_cds:
-                        stats["CP gene"] += 1
-                        descriptions["CP gene"] = desc
-                        self.type_to_ids.setdefault("CP gene".lower(), []).append(seq_id)
-                    else:
-                        stats[key] = stats.get(key, 0) + 1
-                        descriptions[key] = desc
-                        self.type_to_ids.setdefault(key.lower(), []).append(seq_id)
-
-                        desc_key = desc.lower()
-                        if desc_key not in similar_groups:
-                            similar_groups[desc_key] = []
-                        similar_groups[desc_key].append(key)
-
-                if not found_segment:
-                    key = def_key
-                    desc = definition
-                    is_cp_in_def = any(kw in definition for kw in cp_keywords) or key.lower() == "cp"
-                    if is_cp_in_def:
-                        stats["CP gene"] += 1
-                        descriptions["CP gene"] = desc
-                        self.type_to_ids.setdefault("CP gene".lower(), []).append(seq_id)
-                    else:
-                        stats[key] = stats.get(key, 0) + 1
-                        descriptions[key] = desc
-                        self.type_to_ids.setdefault(key.lower(), []).append(seq_id)
-
-                        desc_key = desc.lower()
-                        if desc_key not in similar_groups:
-                            similar_groups[desc_key] = []
-                        similar_groups[desc_key].append(key)
-
-            except Exception as e:
-                logging.error(f"Parsing record failure: {str(e)}")
-                self.status_update.emit(f"<span style='color: red;'>Parsing record failure: {str(e)}</span>")
-
-        total = sum(stats.values())
-        if total == 0:
-            return [["no data", 0, "0%", "Unavailable sequence"]], {}
-        table_data = [
-            [k, v, f"{v / total * 100:.1f}%", descriptions.get(k, k)]
-            for k, v in stats.items() if v > 0
-        ]
-        return sorted(table_data, key=lambda x: x[1], reverse=True), similar_groups
+            self.error.emit(str(e))
 
 
 class VirusAnalysisApp(VirusAnalysisUI):
@@ -362,9 +185,12 @@ class VirusAnalysisApp(VirusAnalysisUI):
 
     def setup_connections(self):
         self.search_button.clicked.connect(self.start_analysis)
+        self.stop_button.clicked.connect(self.stop_analysis)
+        self.estimate_button.clicked.connect(self.estimate_analysis)
         self.download_button.clicked.connect(self.download_sequences)
         self.browse_button.clicked.connect(self.browse_save_path)
         self.accession_browse_button.clicked.connect(self.browse_accession_file)
+        self.local_browse_button.clicked.connect(self.browse_local_file)
         self.result_table.itemChanged.connect(self.handle_table_item_changed)
 
     def browse_accession_file(self):
@@ -390,6 +216,13 @@ class VirusAnalysisApp(VirusAnalysisUI):
                 self.accession_input.clear()
                 self.accession_ids = []
 
+    def browse_local_file(self):
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Select GenBank Files or NCBI Virus Data Report", "",
+            "GenBank / Data Report (*.gb *.gbk *.genbank *.gb.gz *.gbk.gz *.jsonl *.jsonl.gz);;All Files (*)")
+        if file_paths:
+            self.local_input.setText(";".join(file_paths))
+
     def update_progress(self, current, total):
         self.status_label.append(f"Retrieval progress: {current}/{total}")
         self.progress_label.setText(f"Retrieval progress: {current}/{total}")
@@ -403,7 +236,7 @@ class VirusAnalysisApp(VirusAnalysisUI):
             return
 
         should_merge = False
-        similar_count = sum(1 for keys in similar_groups.values() if len(keys) > 1)
+        similar_count = count_similar_groups(similar_groups)
         if similar_count > 0:
             try:
                 msg_box = QMessageBox()
@@ -421,53 +254,51 @@ class VirusAnalysisApp(VirusAnalysisUI):
                 return
 
         if should_merge:
-            try:
-                new_table_data = []
-                processed_keys = set()
-                new_type_to_ids = {}
-                for row in table_data:
-                    typ, num, perc, desc = row
-                    base_key = re.sub(r'(k|kda)$', '', typ.lower())
-                    if base_key in similar_groups and len(similar_groups[base_key]) > 1:
-                        if base_key not in processed_keys:
-                            total_num = sum(
-                                r[1] for r in table_data if re.sub(r'(k|kda)$', '', r[0].lower()) == base_key)
-                            total_perc = f"{total_num / sum(r[1] for r in table_data) * 100:.1f}%"
-                            new_table_data.append([base_key, total_num, total_perc, desc])
-                            ids = []
-                            for k in similar_groups[base_key]:
-                                ids.extend(self.type_to_ids.get(k.lower(), []))
-                            new_type_to_ids[base_key] = ids
-                            processed_keys.add(base_key)
-                    elif base_key not in processed_keys:
-                        new_table_data.append(row)
-                        new_type_to_ids[typ.lower()] = self.type_to_ids.get(typ.lower(), [])
-                        processed_keys.add(base_key)
-                table_data = new_table_data
-                self.type_to_ids = new_type_to_ids
-            except Exception as e:
-                logging.error(f"Failed to merge table data: {str(e)}")
-                self.status_label.append(
-                    f"<span style='color: red;'>Error: Failed to merge table data. {str(e)}</span>")
-                return
+            self.status_label.append("Status: Merging similar fragments...")
+            self.merge_worker = MergeWorker(table_data, similar_groups, self.type_to_ids)
+            self.merge_worker.merged.connect(self.handle_merged_table)
+            self.merge_worker.error.connect(self.handle_merge_error)
+            self.merge_worker.start()
+            return
+        self.show_table(table_data)
+
+    def handle_merged_table(self, merged):
+        table_data, self.type_to_ids = merged
+        self.show_table(table_data)
+
+    def handle_merge_error(self, error):
+        logging.error(f"Failed to merge table data: {error}")
+        self.status_label.append(f"<span style='color: red;'>Error: Failed to merge table data. {error}</span>")
 
+    def handle_partial_update(self, table_data):
+        """Refresh the table in place with the classification so far; the type column stays read-only."""
         try:
             self.is_updating_table = True
-            self.result_table.setRowCount(len(table_data))
-            for row, (typ, num, perc, desc) in enumerate(table_data):
-                type_item = QTableWidgetItem(str(typ))
-                type_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable)
-                self.result_table.setItem(row, 0, type_item)
-                number_item = QTableWidgetItem(str(num))
-                number_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-                self.result_table.setItem(row, 1, number_item)
-                perc_item = QTableWidgetItem(str(perc))
-                perc_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-                self.result_table.setItem(row, 2, perc_item)
-                desc_item = QTableWidgetItem(str(desc))
-                desc_item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-                self.result_table.setItem(row, 3, desc_item)
+            self.result_table.setUpdatesEnabled(False)
+            self.fill_table(table_data, editable=False)
+        except Exception as e:
+            logging.error(f"Failed to update partial table: {str(e)}")
+        finally:
+            self.result_table.setUpdatesEnabled(True)
+            self.is_updating_table = False
 
+    def fill_table(self, table_data, editable=True):
+        """Write rows into result_table, reusing existing items so repeated updates stay cheap."""
+        self.result_table.setRowCount(len(table_data))
+        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        for row, values in enumerate(table_data):
+            for column, value in enumerate(values):
+                item = self.result_table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.result_table.setItem(row, column, item)
+                item.setText(str(value))
+                item.setFlags(flags | Qt.ItemIsEditable if column == 0 and editable else flags)
+
+    def show_table(self, table_data):
+        try:
+            self.is_updating_table = True
+            self.fill_table(table_data)
             self.update_download_combo(table_data)
         except Exception as e:
             logging.error(f"Failed to update table: {str(e)}")
@@ -587,6 +418,7 @@ class VirusAnalysisApp(VirusAnalysisUI):
         self.statusBar().showMessage(status.split("<span")[0].strip(), 5000)
 
     def on_worker_finished(self):
+        self.stop_button.setEnabled(False)
         self.status_label.append("<span style='color: green'>Status: Task completed</span>")
         self.statusBar().showMessage("Task completed", 5000)
 
@@ -643,6 +475,14 @@ class VirusAnalysisApp(VirusAnalysisUI):
 
     def start_analysis(self):
         virus_name = self.virus_input.text()
+        local_paths = [path for path in self.local_input.text().split(";") if path.strip()]
+        if local_paths:
+            missing = [path for path in local_paths if not os.path.exists(path)]
+            if missing:
+                self.status_label.append(f"<span style='color: red'>Status: Local file not found: {missing[0]}</span>")
+                self.statusBar().showMessage("Error: Local file not found", 5000)
+                return
+            virus_name = virus_name or os.path.basename(local_paths[0])
         if not virus_name:
             self.status_label.append(
                 "<span style='color: red'>Status: Please enter the full name of the virus or upload a txt file containing the accession numbers</span>")
@@ -651,9 +491,33 @@ class VirusAnalysisApp(VirusAnalysisUI):
 
         self.status_label.append("Status: Initializing...")
         self.statusBar().showMessage("Initializing...", 5000)
-        self.worker = AnalysisWorker(virus_name)
+        self.worker = AnalysisWorker(virus_name, use_history=self.history_checkbox.isChecked(),
+                                     incremental=self.incremental_checkbox.isChecked(),
+                                     use_taxid=self.taxid_checkbox.isChecked(),
+                                     include_title=self.title_checkbox.isChecked(),
+                                     local_paths=local_paths)
         self.worker.progress_update.connect(self.update_progress)
         self.worker.table_update.connect(self.handle_table_update)
+        self.worker.partial_update.connect(self.handle_partial_update)
         self.worker.status_update.connect(self.update_status)
         self.worker.finished.connect(self.on_worker_finished)
-        self.worker.start()
\ No newline at end of file
+        self.stop_button.setEnabled(True)
+        self.worker.start()
+
+    def estimate_analysis(self):
+        virus_name = self.virus_input.text()
+        if not virus_name:
+            self.status_label.append("<span style='color: red'>Status: Please enter the full name of the virus</span>")
+            self.statusBar().showMessage("Error: No virus name entered", 5000)
+            return
+        self.estimate_worker = AnalysisWorker(virus_name, use_taxid=self.taxid_checkbox.isChecked(),
+                                              include_title=self.title_checkbox.isChecked(), dry_run=True)
+        self.estimate_worker.status_update.connect(self.update_status)
+        self.estimate_worker.start()
+
+    def stop_analysis(self):
+        if self.worker and self.worker.isRunning():
+            self.worker.cancel()
+            self.stop_button.setEnabled(False)
+            self.status_label.append("Status: Stopping after the current batch...")
+            self.statusBar().showMessage("Stopping...", 5000)
\ No newline at end of file
@@ -87,10 +87,55 @@ class VirusAnalysisUI(QMainWindow):
             }
         """)
         self.search_button.setFixedWidth(100)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.setStyleSheet("""
+            QPushButton{
+            padding: 5px 10px;
+            background-color: #2196F3;
+            color: white;
+            font-size: 12px;
+            border-radius: 5px;
+            font-weight: bold;}
+            QPushButton:hover{
+            background-color: #00008b
+            }
+            QPushButton:disabled{
+            background-color: #b0bec5
+            }
+        """)
+        self.stop_button.setFixedWidth(60)
+        self.stop_button.setEnabled(False)
+        self.estimate_button = QPushButton("Estimate")
+        self.estimate_button.setStyleSheet(self.search_button.styleSheet())
+        self.estimate_button.setToolTip("Dry run: count records and project download size and duration")
+        self.estimate_button.setFixedWidth(80)
         input_layout.addWidget(self.virus_label)
         input_layout.addWidget(self.virus_input)
         input_layout.addWidget(self.search_button)
+        input_layout.addWidget(self.estimate_button)
+        input_layout.addWidget(self.stop_button)
         settings_layout.addLayout(input_layout)
+        options_layout = QHBoxLayout()
+        self.history_checkbox = QCheckBox("Use Entrez history server (recommended for large taxa)")
+        self.history_checkbox.setStyleSheet("font-size: 12px;")
+        options_layout.addWidget(self.history_checkbox)
+        self.incremental_checkbox = QCheckBox("Incremental update (fetch only records new since last run)")
+        self.incremental_checkbox.setStyleSheet("font-size: 12px;")
+        options_layout.addWidget(self.incremental_checkbox)
+        options_layout.addStretch()
+        settings_layout.addLayout(options_layout)
+        query_layout = QHBoxLayout()
+        self.taxid_checkbox = QCheckBox("Search by taxonomy ID (txid[Organism:exp])")
+        self.taxid_checkbox.setStyleSheet("font-size: 12px;")
+        query_layout.addWidget(self.taxid_checkbox)
+        self.title_checkbox = QCheckBox("Also match virus name in title")
+        self.title_checkbox.setStyleSheet("font-size: 12px;")
+        self.title_checkbox.setChecked(True)
+        self.title_checkbox.setEnabled(False)
+        self.taxid_checkbox.toggled.connect(self.title_checkbox.setEnabled)
+        query_layout.addWidget(self.title_checkbox)
+        query_layout.addStretch()
+        settings_layout.addLayout(query_layout)
         or_label = QLabel("     OR      ")
         or_label.setStyleSheet("font-weight: bold; margin: 2px 0px;font-size: 12px;")
         or_label.setContentsMargins(0, 2, 0, 2)
@@ -118,6 +163,30 @@ class VirusAnalysisUI(QMainWindow):
         accession_layout.addWidget(self.accession_input)
         accession_layout.addWidget(self.accession_browse_button)
         settings_layout.addLayout(accession_layout)
+        local_layout = QHBoxLayout()
+        self.local_label = QLabel("Local Data:")
+        self.local_label.setStyleSheet("font-size: 12px;")
+        self.local_input = QLineEdit()
+        self.local_input.setPlaceholderText("GenBank flatfile(s) or NCBI Virus data_report.jsonl, classified offline")
+        self.local_input.setStyleSheet("padding: 3px; border: 1px solid #ddd; border-radius: 5px;font-size: 12px;")
+        self.local_browse_button = QPushButton("...")
+        self.local_browse_button.setStyleSheet("""
+            QPushButton{
+            padding: 5px 10px;
+            background-color: #2196F3;
+            color: white;
+            border-radius: 5px;
+            font-size: 12px;
+            font-weight: bold;}
+            QPushButton:hover{
+            background-color: #00008b
+            }
+        """)
+        self.local_browse_button.setFixedWidth(100)
+        local_layout.addWidget(self.local_label)
+        local_layout.addWidget(self.local_input)
+        local_layout.addWidget(self.local_browse_button)
+        settings_layout.addLayout(local_layout)
         settings_group.setLayout(settings_layout)
         settings_group.setContentsMargins(5, 5, 5, 5)
         settings_group.setFixedHeight(settings_group.sizeHint().height() + 5)
@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+
+DATA_REPORT_NAME = "data_report.jsonl"
+ANNOTATION_REPORT_NAME = "annotation_report.jsonl"
+
+_annotation_maps = {}
+
+
+def resolve_local_inputs(paths):
+    """Expand data-package directories to their data_report.jsonl; returns [(kind, path)]."""
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                if DATA_REPORT_NAME in files:
+                    inputs.append(("report", os.path.join(root, DATA_REPORT_NAME)))
+        elif path.endswith((".jsonl", ".jsonl.gz")):
+            inputs.append(("report", path))
+        else:
+            inputs.append(("genbank", path))
+    return inputs
+
+
+def load_annotation_map(report_path):
+    """Map accession -> [(gene, product)] from the annotation_report.jsonl beside a data report, if any."""
+    if report_path in _annotation_maps:
+        return _annotation_maps[report_path]
+    annotations = {}
+    path = os.path.join(os.path.dirname(report_path), ANNOTATION_REPORT_NAME)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    annotations[entry.get("accession")] = annotation_cds(entry)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable annotation report {path}: {str(e)}")
+    _annotation_maps[report_path] = annotations
+    return annotations
+
+
+def annotation_cds(entry):
+    cds = []
+    for gene in entry.get("genes") or []:
+        gene_name = gene.get("name") or gene.get("symbol") or ""
+        for item in gene.get("cds") or [{}]:
+            product = item.get("name") or (item.get("protein") or {}).get("name") or ""
+            cds.append((gene_name, product))
+    return cds
+
+
+def data_report_fields(entry, annotations=None):
+    """Return (accession, definition, [(gene, product)]) for one NCBI Virus data-report entry.
+
+    Reports carry no feature table; CDS come from the entry's own "genes" or the sibling
+    annotation report, otherwise the record classifies from its title alone.
+    """
+    seq_id = entry.get("accession")
+    definition = entry.get("title") or entry.get("genbankTitle")
+    if not definition:
+        parts = [(entry.get("virus") or {}).get("organismName", "")]
+        isolate = (entry.get("isolate") or {}).get("name")
+        if isolate:
+            parts.append(f"isolate {isolate}")
+        if entry.get("segment"):
+            parts.append(f"segment {entry['segment']}")
+        parts.append("complete genome" if entry.get("completeness") == "COMPLETE" else "partial sequence")
+        definition = " ".join(p for p in parts if p)
+    cds = annotation_cds(entry)
+    if not cds and annotations:
+        cds = annotations.get(seq_id, [])
+    return seq_id, definition, cds
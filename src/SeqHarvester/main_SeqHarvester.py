@@ -1,9 +1,11 @@
 from PyQt5.QtWidgets import QApplication
+import multiprocessing
 import sys
 from SeqHarvester.function_SeqHarvester import VirusAnalysisApp
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = VirusAnalysisApp()
     window.show()
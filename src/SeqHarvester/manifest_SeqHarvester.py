@@ -0,0 +1,59 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+from Genbank_cache import DEFAULT_CACHE_DIR
+
+SURVEY_DIR = os.path.join(DEFAULT_CACHE_DIR, "surveys")
+
+
+def survey_manifest_path(term, directory=SURVEY_DIR):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", term).strip("_")[:60]
+    digest = hashlib.sha1(term.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(directory, f"{slug}_{digest}.json")
+
+
+def survey_checkpoint_path(term, directory=SURVEY_DIR):
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as e:
+        logging.warning(f"Could not create survey directory {directory}: {str(e)}")
+    return survey_manifest_path(term, directory)[:-len(".json")] + ".checkpoint.jsonl"
+
+
+def load_survey_manifest(term, directory=SURVEY_DIR):
+    """Return the saved survey for an esearch term, or None."""
+    path = survey_manifest_path(term, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("term") != term:
+            return None
+        return manifest
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable survey manifest {path}: {str(e)}")
+        return None
+
+
+def save_survey_manifest(term, ids, contributions, directory=SURVEY_DIR):
+    """Store the accession list and per-record classification of a survey run."""
+    path = survey_manifest_path(term, directory)
+    manifest = {
+        "term": term,
+        "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "ids": list(ids),
+        "contributions": {seq_id: [list(c) for c in items] for seq_id, items in contributions.items()},
+    }
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not save survey manifest {path}: {str(e)}")
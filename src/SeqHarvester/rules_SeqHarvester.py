@@ -0,0 +1,163 @@
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+from Genbank_cache import DEFAULT_CACHE_DIR
+
+RULES_FILE = os.environ.get("VIRPHYKIT_RULES", os.path.join(DEFAULT_CACHE_DIR, "seqharvester_rules.json"))
+
+DEFAULT_RULES = {
+    # Substrings marking a coat/capsid protein in a definition line or CDS product
+    "cp_keywords": ["capsid protein", "coat protein", "cp protein", "cp", "coat protein-like"],
+    # Definition phrases of a complete record (ignored when the definition also says "partial")
+    "complete_markers": ["complete genome", "complete sequence", "whole genome"],
+    # Filler words dropped from gene/product names before the type key is taken
+    "strip_words": ["protein", "viral", "genome-linked", "with", "activity", "gene"],
+    # Normalized key -> type it is reported under, e.g. {"Nucleocapsid": "N"}
+    "aliases": {},
+}
+
+
+def keyword_automaton(keywords):
+    """Compile keywords into one alternation; a single search replaces any(kw in text) over the list."""
+    keywords = sorted({kw.lower() for kw in keywords if kw}, key=len, reverse=True)
+    if not keywords:
+        return re.compile(r"(?!)")
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+
+class ClassificationRules:
+    """Precompiled gene/segment naming rules used by the SeqHarvester classifier."""
+
+    _PARENTHESES = re.compile(r"\([^()]*\)")
+    _LEADING_NAME = re.compile(r"^(?:[a-z]+-)?[a-z0-9]+")
+    _DEFINITION_GENE = re.compile(r"(\w+(?:-\w+)?)\s+gene")
+
+    def __init__(self, rules=None):
+        rules = dict(DEFAULT_RULES, **(rules or {}))
+        self.rules = rules
+        self.cp_pattern = keyword_automaton(rules["cp_keywords"])
+        self.complete_pattern = keyword_automaton(rules["complete_markers"])
+        self.strip_pattern = re.compile(
+            r"\b(" + "|".join(re.escape(w.lower()) for w in rules["strip_words"]) + r")\b"
+            if rules["strip_words"] else r"(?!)")
+        self.aliases = {k.lower(): v for k, v in rules["aliases"].items()}
+        self._names = {}
+
+    def __getstate__(self):
+        return {"rules": self.rules}
+
+    def __setstate__(self, state):
+        self.__init__(state["rules"])
+
+    def normalize_name(self, name):
+        if not name:
+            return None
+        key = self._names.get(name)
+        if key is None:
+            key = self._normalize(name)
+            self._names[name] = key
+        return key
+
+    def _normalize(self, name):
+        name = name.lower().strip()
+        name = self._PARENTHESES.sub("", name).strip()
+        name = self.strip_pattern.sub("", name).strip()
+        match = self._LEADING_NAME.match(name)
+        if match:
+            key = match.group(0).title()
+        else:
+            words = name.split()
+            key = words[0].title() if words else name.title()
+        return self.aliases.get(key.lower(), key)
+
+    def extract_from_definition(self, definition):
+        match = self._DEFINITION_GENE.search(definition.lower())
+        if match:
+            return self.normalize_name(match.group(1))
+        return None
+
+    def is_complete(self, definition):
+        return self.complete_pattern.search(definition) is not None and "partial" not in definition
+
+    def has_cp_keyword(self, text):
+        return self.cp_pattern.search(text) is not None
+
+
+def load_rules(path):
+    """Read a JSON rules table; keys missing from the file keep their DEFAULT_RULES value."""
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    unknown = set(rules) - set(DEFAULT_RULES)
+    if unknown:
+        raise ValueError(f"Unknown rule keys: {', '.join(sorted(unknown))}")
+    return ClassificationRules(rules)
+
+
+_default_rules = None
+
+
+def default_rules():
+    """Rules from RULES_FILE when it exists, otherwise the built-in DEFAULT_RULES."""
+    global _default_rules
+    if _default_rules is None:
+        if os.path.exists(RULES_FILE):
+            try:
+                _default_rules = load_rules(RULES_FILE)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable rules table {RULES_FILE}: {str(e)}")
+        if _default_rules is None:
+            _default_rules = ClassificationRules()
+    return _default_rules
+
+
+def _legacy_normalize(name):
+    name = name.lower().strip()
+    name = re.sub(r'\([^()]*\)', '', name).strip()
+    name = re.sub(r'\b(protein|viral|genome-linked|with|activity|gene)\b', '', name).strip()
+    match = re.match(r'^(?:[a-z]+-)?[a-z0-9]+', name)
+    if match:
+        return match.group(0).title()
+    words = name.split()
+    return words[0].title() if words else name.title()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m SeqHarvester.rules_SeqHarvester",
+        description="Micro-benchmark of CDS classification: compiled rules vs. per-call regular expressions.")
+    parser.add_argument("-n", "--features", type=int, default=100000, help="Number of synthetic CDS features")
+    parser.add_argument("--rules", help="JSON rules table to benchmark instead of the defaults")
+    myargs = parser.parse_args(sys.argv[1:])
+
+    products = ["coat protein", "nucleocapsid protein", "RNA-dependent RNA polymerase", "movement protein",
+                "polyprotein", "VPg (genome-linked protein)", "replicase with helicase activity", "P1 protein",
+                "HC-Pro", "6K2 protein", "capsid protein VP1", "glycoprotein precursor", "NSs", "hypothetical"]
+    rng = random.Random(1)
+    features = [(rng.choice(["", "", "cp", "N", "rdrp", "mp"]), rng.choice(products) + rng.choice(["", "", " 2"]))
+                for _ in range(myargs.features)]
+    definition = "potato virus y isolate x coat protein gene, partial cds"
+    cp_keywords = ["capsid protein", "coat protein", "cp protein", "cp", "CP", "Cp", "coat protein-like"]
+
+    start = time.perf_counter()
+    for gene, product in features:
+        key = _legacy_normalize(gene or product)
+        any(kw in definition for kw in cp_keywords) and any(kw in product.lower() for kw in cp_keywords)
+    legacy_time = time.perf_counter() - start
+
+    engine = load_rules(myargs.rules) if myargs.rules else ClassificationRules()
+    start = time.perf_counter()
+    for gene, product in features:
+        key = engine.normalize_name(gene or product)
+        engine.has_cp_keyword(definition) and engine.has_cp_keyword(product.lower())
+    engine_time = time.perf_counter() - start
+
+    n = max(len(features), 1)
+    print(f"per-call regex:  {legacy_time:.3f}s ({legacy_time / n * 1e6:.2f} us/feature)")
+    print(f"compiled rules:  {engine_time:.3f}s ({engine_time / n * 1e6:.2f} us/feature, "
+          f"{legacy_time / max(engine_time, 1e-9):.1f}x faster)")
@@ -0,0 +1,77 @@
+import hashlib
+import os
+
+try:
+    from Subsample.index_subsample import FastaIndex
+    from Subsample.strata_subsample import parse_strata_keys, read_metadata, stratum_keys
+except ModuleNotFoundError:  # imported by fuction_subsample.py run as a script
+    from index_subsample import FastaIndex
+    from strata_subsample import parse_strata_keys, read_metadata, stratum_keys
+
+MEMBERS_FILE = "dedup_members.tsv"
+# Alignment gap characters are not part of the sequence identity
+_GAPS = str.maketrans("", "", "-.")
+
+
+def sequence_hash(seq):
+    """128-bit digest of a sequence, ignoring case and gaps."""
+    return hashlib.blake2b(seq.upper().translate(_GAPS).encode("ascii", errors="replace"), digest_size=16).digest()
+
+
+def collapse_identical(fasta_file, output_dir=None, output_file_name="dedup.fas", region_keys=None,
+                       metadata_file=None, members_file_name=MEMBERS_FILE):
+    """Keep the first record of every identical sequence, streaming the input once.
+
+    With `region_keys` (a stratum key spec such as "2" or "country", see parse_strata_keys) identical
+    sequences are only collapsed within the same region. Every record is listed in the members table
+    next to its representative. Returns (deduplicated file, members table, records read, representatives kept).
+    """
+    if isinstance(region_keys, str):
+        region_keys = parse_strata_keys(region_keys)
+    metadata = read_metadata(metadata_file) if metadata_file else None
+    try:
+        index = FastaIndex(fasta_file)
+    except Exception as e:
+        raise Exception(f"Error reading FASTA file: {str(e)}")
+
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(__file__))
+    dedup_file = os.path.join(output_dir, output_file_name)
+    members_file = os.path.join(output_dir, members_file_name)
+    if os.path.abspath(dedup_file) == os.path.abspath(fasta_file):
+        raise ValueError(f"Output file {dedup_file} must differ from the input file.")
+
+    representatives = {}
+    members = {}
+    with index:
+        regions = stratum_keys(index.names, region_keys, metadata) if region_keys else None
+        try:
+            with open(dedup_file, "w") as f:
+                for i, (name, seq) in enumerate(index.records()):
+                    key = (regions[i] if regions else None, sequence_hash(seq))
+                    representative = representatives.get(key)
+                    if representative is None:
+                        representative = representatives[key] = name
+                        members[name] = []
+                        f.write(f"{name}\n{seq}" if len(members) == 1 else f"\n{name}\n{seq}")
+                    members[representative].append(name)
+        except Exception as e:
+            raise Exception(f"Error writing output file {dedup_file}: {str(e)}")
+        total = len(index)
+
+    try:
+        with open(members_file, "w", encoding="utf-8") as f:
+            f.write("representative\tmember\n")
+            for representative, names in members.items():
+                for name in names:
+                    f.write(f"{representative.lstrip('>')}\t{name.lstrip('>')}\n")
+    except Exception as e:
+        raise Exception(f"Error writing members table {members_file}: {str(e)}")
+    return dedup_file, members_file, total, len(members)
+
+
+def collapse_summary(dedup_file, members_file, total, kept):
+    removed = total - kept
+    percent = removed / total * 100 if total else 0
+    return (f"<b><span style='color: green;'>Collapsed identical sequences: kept {kept} of {total} "
+            f"({removed} duplicates, {percent:.1f}% removed). Output file: {dedup_file}, members table: {members_file}</span></b>")
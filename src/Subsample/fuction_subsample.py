@@ -3,113 +3,187 @@ import os
 import argparse
 import sys
 import re
+import json
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+try:
+    from Subsample.index_subsample import FastaIndex
+except ModuleNotFoundError:  # run as a script from inside Subsample/
+    from index_subsample import FastaIndex
 
-def run_subsampling(fasta_file, num_seqs, region=None, output_dir=None, equal_sampling=False, status_update=None, output_file_name="extract.fas"):
-    dict_fas = OrderedDict()
+SEED_MANIFEST = "replicate_seeds.json"
 
+def write_records(path, records):
+    """Write (header, sequence) pairs one at a time, in the same layout as before (no trailing newline)."""
+    with open(path, "w") as f:
+        for i, (name, seq) in enumerate(records):
+            f.write(f"{name}\n{seq}" if i == 0 else f"\n{name}\n{seq}")
+
+
+def site_groups(names):
+    """Record indices per sampling site, keyed in first-seen order."""
+    site_dict = OrderedDict()
+    for i, fas_name in enumerate(names):
+
+        match = re.search(r"(?:^|>|_)([A-Za-z0-9]+)(?:_|$)", fas_name)
+        if not match:
+            raise ValueError(f"Cannot parse site from sequence name: {fas_name}")
+        site = match.group(1)
+        site_dict.setdefault(site, []).append(i)
+    return site_dict
+
+
+def equal_sample(site_dict, rng=random):
+    """Draw the smallest site size from every site; `rng` fixes the draw when seeded."""
+    min_seq_num = min(len(seqs) for seqs in site_dict.values())
+    if min_seq_num == 0:
+        raise ValueError("Some sites have zero sequences.")
+
+    sampled_indices = []
+    for site, seqs in site_dict.items():
+        sampled_indices.extend(rng.sample(seqs, min_seq_num))
+    return sampled_indices
+
+
+def replicate_seed(master_seed, replicate):
+    """Seed of one replicate, derived only from the master seed and the replicate number."""
+    return random.Random(f"{master_seed}:{replicate}").getrandbits(32)
+
+
+def split_records(index, selected, extract_file, remaining_file):
+    """Stream every record, in file order, to `extract_file` if its index is in `selected`, else to `remaining_file`."""
+    with open(extract_file, "w") as extract, open(remaining_file, "w") as remaining:
+        first = {extract: True, remaining: True}
+        for i, (name, seq) in enumerate(index.records()):
+            out = extract if i in selected else remaining
+            out.write(f"{name}\n{seq}" if first[out] else f"\n{name}\n{seq}")
+            first[out] = False
+
+
+def run_subsampling(fasta_file, num_seqs, region=None, output_dir=None, equal_sampling=False, status_update=None, output_file_name="extract.fas", seed=None, in_place=False, remaining_file_name="remaining.fas"):
+    """Sample `num_seqs` records, or with `region` remove them from that region's records.
+
+    Region removal writes the removed records to `output_file_name` and the rest to `remaining_file_name`
+    in `output_dir`; the input file is only replaced by the remaining records when `in_place` is set.
+    """
     try:
-        with open(fasta_file) as f2:
-            line = f2.readline()
-            while line != "":
-                while not line.startswith('>') and line != "":
-                    line = f2.readline()
-                fas_name = line.strip()
-                fas_seq = ""
-                line = f2.readline()
-                while not line.startswith('>') and line != "":
-                    fas_seq += re.sub(r"\s", "", line)
-                    line = f2.readline()
-                dict_fas[fas_name] = fas_seq
+        index = FastaIndex(fasta_file)
     except Exception as e:
         raise Exception(f"Error reading FASTA file: {str(e)}")
-
+    rng = random if seed is None else random.Random(seed)
 
     if output_dir is None:
         output_dir = os.path.dirname(os.path.abspath(__file__))
     extract_file = os.path.join(output_dir, output_file_name)
 
-    if equal_sampling:
+    with index:
+        names = index.names
+        if equal_sampling:
 
-        site_dict = OrderedDict() 
-        for fas_name, fas_seq in dict_fas.items():
-   
-            match = re.search(r"(?:^|>|_)([A-Za-z0-9]+)(?:_|$)", fas_name)
-            if not match:
-                raise ValueError(f"Cannot parse site from sequence name: {fas_name}")
-            site = match.group(1)
-            site_dict.setdefault(site, []).append((fas_name, fas_seq))
+            sampled_indices = equal_sample(site_groups(names), rng)
 
+            try:
+                write_records(extract_file, index.records(sampled_indices))
+            except Exception as e:
+                raise Exception(f"Error writing output file {extract_file}: {str(e)}")
 
-        region_counts = {site: len(seqs) for site, seqs in site_dict.items()}
+        elif region:
 
-        min_seq_num = min(len(seqs) for seqs in site_dict.values())
-        if min_seq_num == 0:
-            raise ValueError("Some sites have zero sequences.")
+            region_indices = [i for i, name in enumerate(names) if region in name]
+            total_region_sequences = len(region_indices)
 
-        sample_num = min_seq_num
+            if num_seqs > total_region_sequences:
+                raise ValueError(
+                    f"Requested to remove {num_seqs} sequences, but only {total_region_sequences} sequences with region {region} are available."
+                )
 
-        sampled_sequences = []
-        for site, seqs in site_dict.items():
-            sampled = random.sample(seqs, sample_num)
-            sampled_sequences.extend(sampled)
-
-        extract_fas = "\n".join([f"{name}\n{seq}" for name, seq in sampled_sequences])
-        try:
-            with open(extract_file, "w") as f:
-                f.write(extract_fas)
-        except Exception as e:
-            raise Exception(f"Error writing output file {extract_file}: {str(e)}")
+            if in_place and num_seqs == total_region_sequences:
+                raise ValueError("Cannot remove all sequences, please backup the original file.")
 
-    elif region:
+            sequences_to_remove = set(rng.sample(region_indices, num_seqs))
+            remaining_file = fasta_file + ".tmp" if in_place else os.path.join(output_dir, remaining_file_name)
+            outputs = [os.path.abspath(extract_file), os.path.abspath(remaining_file)]
+            if os.path.abspath(fasta_file) in outputs or outputs[0] == outputs[1]:
+                raise ValueError(f"Output files {extract_file} and {remaining_file} must differ from each other and from the input file.")
+            try:
+                split_records(index, sequences_to_remove, extract_file, remaining_file)
+            except Exception as e:
+                raise Exception(f"Error writing output files {extract_file}, {remaining_file}: {str(e)}")
 
-        region_sequences = {name: seq for name, seq in dict_fas.items() if region in name}
-        remaining_sequences = {name: seq for name, seq in dict_fas.items() if region not in name}
-        total_region_sequences = len(region_sequences)
+            if not in_place:
+                return f"<b><span style='color: green;'>Done! Subsampled {num_seqs} sequences from '{region}'. Subsampled sequences saved in {extract_file}, remaining sequences saved in {remaining_file}</span></b>"
+        else:
 
-        if num_seqs > total_region_sequences:
-            raise ValueError(
-                f"Requested to remove {num_seqs} sequences, but only {total_region_sequences} sequences with region {region} are available."
-            )
+            total_sequences = len(names)
+            if num_seqs > total_sequences:
+                raise ValueError(f"Requested {num_seqs} sequences, but only {total_sequences} available.")
 
-        if num_seqs == total_region_sequences:
-            raise ValueError("Cannot remove all sequences, please backup the original file.")
+            sampled_indices = rng.sample(range(total_sequences), num_seqs)
+            try:
+                write_records(extract_file, index.records(sampled_indices))
+            except Exception as e:
+                raise Exception(f"Error writing output file {extract_file}: {str(e)}")
 
-        sequences_to_remove = random.sample(list(region_sequences.items()), num_seqs)
-        final_remaining = {
-            **remaining_sequences,
-            **{name: seq for name, seq in dict_fas.items() if name not in [s[0] for s in sequences_to_remove]}
-        }
+            return f"<b><span style='color: green;'>Done! Selected {num_seqs} sequences. Output file: {extract_file}</span></b>"
 
-        extract_fas = "\n".join([f"{name}\n{seq}" for name, seq in sequences_to_remove])
+    if region and not equal_sampling:
+        # in_place only: the memory map is closed now, so the original file can be replaced
         try:
-            with open(extract_file, "w") as f:
-                f.write(extract_fas)
-        except Exception as e:
-            raise Exception(f"Error writing extract file {extract_file}: {str(e)}")
-
-        remaining_fas = "\n".join([f"{name}\n{seq}" for name, seq in final_remaining.items()])
-        try:
-            with open(fasta_file, "w") as f:
-                f.write(remaining_fas)
+            os.replace(remaining_file, fasta_file)
             return f"<b><span style='color: green;'>Done! Subsampled {num_seqs} sequences from '{region}'. Subsampled sequences saved in {extract_file}, remaining sequences saved in {fasta_file}</span></b>"
         except Exception as e:
             raise Exception(f"Error writing to original file: {str(e)}")
-    else:
 
-        total_sequences = len(dict_fas)
-        if num_seqs > total_sequences:
-            raise ValueError(f"Requested {num_seqs} sequences, but only {total_sequences} available.")
+def generate_replicates(fasta_file, replicates, output_dir=None, seed=None, workers=None, status_update=None):
+    """Write `replicates` equal-sampling replicates from one index of `fasta_file`.
 
-        sampled_sequences = random.sample(list(dict_fas.items()), num_seqs)
-        extract_fas = "\n".join([f"{name}\n{seq}" for name, seq in sampled_sequences])
+    Replicate i (1-based) is drawn with replicate_seed(seed, i), so any single replicate can be regenerated
+    from the seed manifest written next to the outputs. Returns the manifest path.
+    """
+    try:
+        index = FastaIndex(fasta_file)
+    except Exception as e:
+        raise Exception(f"Error reading FASTA file: {str(e)}")
+
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(__file__))
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(32)
+    seeds = [replicate_seed(seed, i) for i in range(1, replicates + 1)]
+    files = [f"extract_rep{i}.fas" if replicates > 1 else "extract.fas" for i in range(1, replicates + 1)]
+
+    def write_replicate(i):
+        sampled_indices = equal_sample(site_dict, random.Random(seeds[i]))
+        extract_file = os.path.join(output_dir, files[i])
         try:
-            with open(extract_file, "w") as f:
-                f.write(extract_fas)
+            write_records(extract_file, index.records(sampled_indices))
         except Exception as e:
             raise Exception(f"Error writing output file {extract_file}: {str(e)}")
+        return len(sampled_indices)
+
+    with index:
+        site_dict = site_groups(index.names)
+        with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+            futures = [pool.submit(write_replicate, i) for i in range(replicates)]
+            for done, future in enumerate(as_completed(futures), 1):
+                sampled = future.result()
+                if status_update is not None:
+                    status_update.emit(f"Replicate {done}/{replicates} written ({sampled} sequences)")
+
+    manifest_file = os.path.join(output_dir, SEED_MANIFEST)
+    manifest = {
+        "input": os.path.abspath(fasta_file),
+        "seed": seed,
+        "sites": {site: len(seqs) for site, seqs in site_dict.items()},
+        "replicates": [{"file": name, "seed": rep_seed} for name, rep_seed in zip(files, seeds)],
+    }
+    try:
+        with open(manifest_file, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+    except Exception as e:
+        raise Exception(f"Error writing seed manifest {manifest_file}: {str(e)}")
+    return manifest_file
 
-        return f"<b><span style='color: green;'>Done! Selected {num_seqs} sequences. Output file: {extract_file}</span></b>"
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -122,10 +196,53 @@ if __name__ == "__main__":
 
         2) Meio
         python function_subsample.py fas_file 100 -i _China_
+
+        3) 100 equal-sampling replicates, reproducible from the seed:
+        python function_subsample.py fas_file 0 -e -r 100 --seed 42 -o out_dir
+
+        4) 500 sequences stratified by country x year x host, at most 20 and at least 2 per stratum:
+        python function_subsample.py fas_file 500 -s country,date:year,host -m metadata.tsv --cap 20 --min 2
         '''
     )
     parser.add_argument("file", help='input FASTA file')
     parser.add_argument('num_seqs', help='number of sequences to select/remove', type=int)
     parser.add_argument('-i', '--region', help='geographic region to filter (e.g., "China")', default=None)
+    parser.add_argument('-e', '--equal', help='sample the smallest site size from every site', action='store_true')
+    parser.add_argument('-r', '--replicates', help='number of equal-sampling replicates', type=int, default=1)
+    parser.add_argument('--seed', help='master random seed (recorded in the seed manifest)', type=int, default=None)
+    parser.add_argument('-o', '--outdir', help='output directory', default=None)
+    parser.add_argument('-j', '--jobs', help='replicates written concurrently', type=int, default=None)
+    parser.add_argument('-s', '--strata', help='stratum keys: 1-based header fields and/or metadata columns, '
+                                               'optionally with :year (e.g. "2,3:year")', default=None)
+    parser.add_argument('-m', '--metadata', help='TSV/CSV metadata table keyed by sequence ID', default=None)
+    parser.add_argument('--cap', help='maximum sequences per stratum', type=int, default=None)
+    parser.add_argument('--min', help='minimum sequences per stratum', type=int, default=0)
+    parser.add_argument('--in-place', help='with -i, replace the input file by the remaining sequences instead '
+                                           'of writing remaining.fas', action='store_true')
+    parser.add_argument('--dedup', help='collapse identical sequences into dedup.fas (with a members table) '
+                                       'and subsample from it', action='store_true')
+    parser.add_argument('--dedup-by', help='with --dedup, only collapse identical sequences sharing these stratum '
+                                           'keys (e.g. "2" for the second header field)', default=None)
     myargs = parser.parse_args(sys.argv[1:])
-    run_subsampling(myargs.file, myargs.num_seqs, myargs.region, None)
\ No newline at end of file
+    if myargs.dedup:
+        try:
+            from Subsample.dedup_subsample import collapse_identical, collapse_summary
+        except ModuleNotFoundError:
+            from dedup_subsample import collapse_identical, collapse_summary
+        dedup = collapse_identical(myargs.file, myargs.outdir, region_keys=myargs.dedup_by, metadata_file=myargs.metadata)
+        print(collapse_summary(*dedup))
+        myargs.file = dedup[0]
+        if not myargs.num_seqs and not myargs.equal and not myargs.strata:
+            sys.exit(0)
+    if myargs.strata:
+        try:
+            from Subsample.strata_subsample import run_stratified
+        except ModuleNotFoundError:
+            from strata_subsample import run_stratified
+        print(run_stratified(myargs.file, myargs.strata, myargs.num_seqs or None, myargs.cap, myargs.min,
+                             myargs.metadata, output_dir=myargs.outdir, seed=myargs.seed))
+    elif myargs.equal:
+        print(generate_replicates(myargs.file, myargs.replicates, myargs.outdir, myargs.seed, myargs.jobs))
+    else:
+        print(run_subsampling(myargs.file, myargs.num_seqs, myargs.region, myargs.outdir, seed=myargs.seed,
+                              in_place=myargs.in_place))
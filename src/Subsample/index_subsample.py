@@ -0,0 +1,98 @@
+import logging
+import mmap
+import os
+
+INDEX_SUFFIX = ".vfai"
+INDEX_VERSION = "vfai1"
+_WHITESPACE = b" \t\r\n\x0b\x0c"
+
+
+def scan_fasta(data):
+    """One linear pass over FASTA bytes; returns [(header, sequence start, sequence end)].
+
+    Only the '>' line starts are searched for, so the cost does not depend on line count.
+    Duplicate headers keep their first position and the last record's sequence, like a dict.
+    """
+    entries = {}
+    pos = 0 if data[:1] == b">" else data.find(b"\n>")
+    if pos != -1 and data[:1] != b">":
+        pos += 1
+    size = len(data)
+    while pos != -1 and pos < size:
+        header_end = data.find(b"\n", pos)
+        if header_end == -1:
+            header_end = size
+        next_pos = data.find(b"\n>", header_end)
+        seq_end = size if next_pos == -1 else next_pos + 1
+        name = data[pos:header_end].strip().decode("utf-8", errors="replace")
+        entries[name] = (name, min(header_end + 1, size), seq_end)
+        pos = -1 if next_pos == -1 else next_pos + 1
+    return list(entries.values())
+
+
+class FastaIndex:
+    """Random access to FASTA records through a memory map and a reusable sidecar index.
+
+    The index (<fasta>.vfai: header, sequence byte start, sequence byte end per record) is rebuilt
+    when the FASTA file's size or mtime no longer match the ones recorded in it.
+    """
+
+    def __init__(self, fasta_file, index_file=None):
+        self.fasta_file = fasta_file
+        self.index_file = index_file or fasta_file + INDEX_SUFFIX
+        self._file = open(fasta_file, "rb")
+        stat = os.fstat(self._file.fileno())
+        self.stamp = f"{stat.st_size}\t{stat.st_mtime_ns}"
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+        self.entries = self._load_index()
+        if self.entries is None:
+            self.entries = scan_fasta(self._map)
+            self._save_index()
+        self.names = [entry[0] for entry in self.entries]
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                if f.readline().rstrip("\n") != f"{INDEX_VERSION}\t{self.stamp}":
+                    return None
+                entries = []
+                for line in f:
+                    name, start, end = line.rstrip("\n").rsplit("\t", 2)
+                    entries.append((name, int(start), int(end)))
+                return entries
+        except (OSError, ValueError):
+            return None
+
+    def _save_index(self):
+        tmp_file = self.index_file + ".tmp"
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write(f"{INDEX_VERSION}\t{self.stamp}\n")
+                for name, start, end in self.entries:
+                    f.write(f"{name}\t{start}\t{end}\n")
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            logging.warning(f"Could not save FASTA index {self.index_file}: {str(e)}")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def sequence(self, i):
+        _, start, end = self.entries[i]
+        return self._map[start:end].translate(None, _WHITESPACE).decode("utf-8", errors="replace")
+
+    def records(self, indices=None):
+        """Yield (header, sequence) for the given record indices (all records when None), in that order."""
+        for i in range(len(self.entries)) if indices is None else indices:
+            yield self.entries[i][0], self.sequence(i)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
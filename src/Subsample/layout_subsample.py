@@ -2,15 +2,23 @@ from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QPushButton, QWidget, QHBoxLayout, QSizePolicy, QLabel, QComboBox, QRadioButton
 from PyQt5.QtCore import Qt
-from Subsample.fuction_subsample import run_subsampling
+from Subsample.fuction_subsample import run_subsampling, generate_replicates
+from Subsample.strata_subsample import run_stratified
+from Subsample.dedup_subsample import collapse_identical, collapse_summary
 
 class SubsamplingThread(QtCore.QThread):
     finished = QtCore.pyqtSignal(str)
     error = QtCore.pyqtSignal(str)
     status_update = QtCore.pyqtSignal(str)
 
-    def __init__(self, fasta_file, num_seqs, region, output_dir, equal_sampling, replicates=1):
+    def __init__(self, fasta_file, num_seqs, region, output_dir, equal_sampling, replicates=1, strata=None, in_place=False,
+                 dedup=False, dedup_keys=None, metadata_file=None):
         super().__init__()
+        self.dedup = dedup
+        self.dedup_keys = dedup_keys
+        self.metadata_file = metadata_file
+        self.in_place = in_place
+        self.strata = strata
         self.fasta_file = fasta_file
         self.num_seqs = num_seqs
         self.region = region
@@ -20,19 +28,23 @@ class SubsamplingThread(QtCore.QThread):
 
     def run(self):
         try:
-            if self.equal_sampling:
-                for i in range(self.replicates):
-                    output_file = f"extract_rep{i+1}.fas" if self.replicates > 1 else "extract.fas"
-                    result = run_subsampling(
-                        self.fasta_file, self.num_seqs, self.region,
-                        self.output_dir, self.equal_sampling, self.status_update,
-                        output_file_name=output_file
-                    )
-                    if i == 0:
-                        self.status_update.emit(result)
-                self.finished.emit(f"<b><span style='color: green;'>Done! Generated {self.replicates} bootstrap subsampling replicates. Output file: {self.output_dir}</span></b>")
+            fasta_file = self.fasta_file
+            if self.dedup:
+                dedup = collapse_identical(fasta_file, self.output_dir, region_keys=self.dedup_keys,
+                                           metadata_file=self.metadata_file)
+                self.status_update.emit(collapse_summary(*dedup))
+                fasta_file = dedup[0]
+            if self.strata is not None:
+                result = run_stratified(fasta_file, output_dir=self.output_dir,
+                                        total=self.num_seqs or None, **self.strata)
+                self.finished.emit(result)
+            elif self.equal_sampling:
+                manifest_file = generate_replicates(
+                    fasta_file, self.replicates, self.output_dir, status_update=self.status_update
+                )
+                self.finished.emit(f"<b><span style='color: green;'>Done! Generated {self.replicates} bootstrap subsampling replicates. Output file: {self.output_dir} (seeds: {manifest_file})</span></b>")
             else:
-                result = run_subsampling(self.fasta_file, self.num_seqs, self.region, self.output_dir, self.equal_sampling, self.status_update)
+                result = run_subsampling(fasta_file, self.num_seqs, self.region, self.output_dir, self.equal_sampling, self.status_update, in_place=self.in_place)
                 self.finished.emit(result)
         except Exception as e:
             self.error.emit(f"Error: {str(e)}")
@@ -76,6 +88,7 @@ class SubsampleApp(QtWidgets.QMainWindow):
             'Step 1: Upload a FASTA sequence file to be subsampled. Ensure each sequence name includes its geographic region (marked with _region)<br>'
             'Step 2: Specify the desired sample size and/or specific region for the subset;<br>'
             'Step 3: Enable the for subsample bootstrap analysis option and set the number of replicates. This will generate multiple subsampled datasets by randomly selecting sequences—using the smallest sample size among all regions — for each region;<br>'
+            'Or choose Stratified to sample by several keys at once (header fields such as 2,3:year, or metadata columns such as country,date:year,host), with optional per-stratum caps and minimum quotas; a sample size, if given, is shared across strata in proportion to their size;<br>'
             'Step 4: Select an output directory to save the resulting sequences.'
             '</span>'
         )
@@ -162,15 +175,39 @@ class SubsampleApp(QtWidgets.QMainWindow):
         self.normal_radio.setStyleSheet("font-size: 12px")
         self.bootstrap_radio = QRadioButton("Bootstrap")
         self.bootstrap_radio.setStyleSheet("font-size: 12px")
+        self.stratified_radio = QRadioButton("Stratified")
+        self.stratified_radio.setStyleSheet("font-size: 12px")
         self.normal_radio.setChecked(True)
         mode_layout.addWidget(self.normal_radio)
         mode_layout.addWidget(self.bootstrap_radio)
+        mode_layout.addWidget(self.stratified_radio)
         mode_layout.addStretch()
         mode_widget.setLayout(mode_layout)
         settings_layout.addWidget(mode_widget)
 
+        dedup_widget = QtWidgets.QWidget()
+        dedup_layout = QtWidgets.QHBoxLayout()
+        dedup_layout.setContentsMargins(0, 0, 0, 0)
+        self.dedup_checkbox = QtWidgets.QCheckBox("Collapse identical sequences first (dedup.fas)")
+        self.dedup_checkbox.setStyleSheet("font-size: 12px;")
+        dedup_layout.addWidget(self.dedup_checkbox)
+        dedup_keys_label = QtWidgets.QLabel("Per Region Keys (Optional):")
+        dedup_keys_label.setStyleSheet("font-size: 12px;")
+        dedup_layout.addWidget(dedup_keys_label)
+        self.dedup_keys_input = QtWidgets.QLineEdit()
+        self.dedup_keys_input.setPlaceholderText("e.g. 2")
+        self.dedup_keys_input.setStyleSheet("padding: 3px; border: 1px solid #ddd; border-radius: 3px;")
+        self.dedup_keys_input.setEnabled(False)
+        self.dedup_checkbox.toggled.connect(self.dedup_keys_input.setEnabled)
+        self.dedup_checkbox.toggled.connect(self.toggle_input_fields)
+        dedup_layout.addWidget(self.dedup_keys_input)
+        dedup_layout.addStretch()
+        dedup_widget.setLayout(dedup_layout)
+        settings_layout.addWidget(dedup_widget)
+
         self.normal_radio.toggled.connect(self.toggle_input_fields)
         self.bootstrap_radio.toggled.connect(self.toggle_input_fields)
+        self.stratified_radio.toggled.connect(self.toggle_input_fields)
 
         self.bootstrap_widget = QtWidgets.QWidget()
         bootstrap_layout = QtWidgets.QHBoxLayout()
@@ -186,6 +223,63 @@ class SubsampleApp(QtWidgets.QMainWindow):
         self.bootstrap_widget.setLayout(bootstrap_layout)
         settings_layout.addWidget(self.bootstrap_widget)
 
+        self.strata_widget = QtWidgets.QWidget()
+        strata_layout = QtWidgets.QGridLayout()
+        strata_layout.setContentsMargins(0, 0, 0, 0)
+        strata_keys_label = QtWidgets.QLabel("Strata Keys:")
+        strata_keys_label.setStyleSheet("font-size: 12px;")
+        strata_layout.addWidget(strata_keys_label, 0, 0)
+        self.strata_keys_input = QtWidgets.QLineEdit()
+        self.strata_keys_input.setPlaceholderText("Header fields and/or metadata columns, e.g. 2,3:year or country,date:year,host")
+        self.strata_keys_input.setStyleSheet("padding: 3px; border: 1px solid #ddd; border-radius: 3px;")
+        strata_layout.addWidget(self.strata_keys_input, 0, 1, 1, 4)
+        cap_label = QtWidgets.QLabel("Cap per Stratum:")
+        cap_label.setStyleSheet("font-size: 12px;")
+        strata_layout.addWidget(cap_label, 1, 0)
+        self.strata_cap_input = QtWidgets.QLineEdit()
+        self.strata_cap_input.setPlaceholderText("No cap")
+        self.strata_cap_input.setStyleSheet("padding: 3px; border: 1px solid #ddd; border-radius: 3px;")
+        strata_layout.addWidget(self.strata_cap_input, 1, 1)
+        min_label = QtWidgets.QLabel("Minimum per Stratum:")
+        min_label.setStyleSheet("font-size: 12px;")
+        strata_layout.addWidget(min_label, 1, 2)
+        self.strata_min_input = QtWidgets.QLineEdit()
+        self.strata_min_input.setPlaceholderText("0")
+        self.strata_min_input.setStyleSheet("padding: 3px; border: 1px solid #ddd; border-radius: 3px;")
+        strata_layout.addWidget(self.strata_min_input, 1, 3, 1, 2)
+        self.strata_widget.setLayout(strata_layout)
+        settings_layout.addWidget(self.strata_widget)
+
+        # Shared by the Stratified mode and by per-region collapsing of identical sequences
+        self.metadata_widget = QtWidgets.QWidget()
+        metadata_layout = QtWidgets.QHBoxLayout()
+        metadata_layout.setContentsMargins(0, 0, 0, 0)
+        metadata_label = QtWidgets.QLabel("Metadata (Optional):")
+        metadata_label.setStyleSheet("font-size: 12px;")
+        metadata_layout.addWidget(metadata_label)
+        self.metadata_input = QtWidgets.QLineEdit()
+        self.metadata_input.setPlaceholderText("TSV/CSV table whose first column is the sequence ID")
+        self.metadata_input.setStyleSheet("padding: 3px; border: 1px solid #ddd; border-radius: 3px;")
+        metadata_layout.addWidget(self.metadata_input)
+        metadata_button = QtWidgets.QPushButton("...")
+        metadata_button.setFixedWidth(30)
+        metadata_button.setStyleSheet("""
+            QPushButton{
+            padding: 5px 10px;
+            background-color: #2196F3;
+            color: white;
+            font-size: 12px;
+            border-radius: 5px;
+            font-weight: bold;}
+            QPushButton:hover{
+            background-color: #00008b
+            }
+        """)
+        metadata_button.clicked.connect(self.select_metadata_file)
+        metadata_layout.addWidget(metadata_button)
+        self.metadata_widget.setLayout(metadata_layout)
+        settings_layout.addWidget(self.metadata_widget)
+
         num_label = QtWidgets.QLabel("Number of Sequences:")
         num_label.setStyleSheet("font-size: 12px;")
         self.num_label = num_label
@@ -201,6 +295,9 @@ class SubsampleApp(QtWidgets.QMainWindow):
         self.region_input = QtWidgets.QLineEdit()
         self.region_input.setStyleSheet("padding: 3px; border: 1px solid #ddd; border-radius: 3px;")
         settings_layout.addWidget(self.region_input)
+        self.in_place_checkbox = QtWidgets.QCheckBox("Overwrite the sequence file with the remaining sequences (otherwise saved as remaining.fas)")
+        self.in_place_checkbox.setStyleSheet("font-size: 12px;")
+        settings_layout.addWidget(self.in_place_checkbox)
 
         settings_group.setLayout(settings_layout)
         main_layout.addWidget(settings_group)
@@ -219,7 +316,7 @@ class SubsampleApp(QtWidgets.QMainWindow):
             box-shadow: 0 1px 3px rgba(0, 0, 0, 0.1);
         """)
         self.status_output.append(
-            "<b><span style='color: grey;'>Warning: The original file may be overwritten in region-specific mode. Please backup before running!</span></b>")
+            "<b><span style='color: grey;'>Note: Region-specific mode saves the remaining sequences as remaining.fas; the original file is only overwritten when that option is checked. Please backup before overwriting!</span></b>")
         status_layout.addWidget(self.status_output)
         status_group.setLayout(status_layout)
         main_layout.addWidget(status_group, stretch=0)
@@ -270,6 +367,13 @@ class SubsampleApp(QtWidgets.QMainWindow):
             self.file_dir_input.setText(file_name)
             self.statusBar().showMessage(f"Loaded sequence file: {file_name}", 5000)
 
+    def select_metadata_file(self):
+        file_name, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Select Metadata Table", "",
+                                                             "Tables (*.tsv *.txt *.csv);;All Files (*)")
+        if file_name:
+            self.metadata_input.setText(file_name)
+            self.statusBar().showMessage(f"Loaded metadata table: {file_name}", 5000)
+
     def select_output_directory(self):
         directory = QtWidgets.QFileDialog.getExistingDirectory(self, "Select Output Directory")
         if directory:
@@ -284,15 +388,32 @@ class SubsampleApp(QtWidgets.QMainWindow):
             self.num_seqs_input.hide()
             self.region_label.hide()
             self.region_input.hide()
+            self.in_place_checkbox.hide()
             self.bootstrap_widget.show()
+            self.strata_widget.hide()
+        elif self.stratified_radio.isChecked():
+            self.num_seqs_input.setEnabled(True)
+            self.region_input.setEnabled(False)
+            self.num_label.setText("Number of Sequences (Optional, total across strata):")
+            self.num_label.show()
+            self.num_seqs_input.show()
+            self.region_label.hide()
+            self.region_input.hide()
+            self.in_place_checkbox.hide()
+            self.bootstrap_widget.hide()
+            self.strata_widget.show()
         else:
             self.num_seqs_input.setEnabled(True)
             self.region_input.setEnabled(True)
+            self.num_label.setText("Number of Sequences:")
             self.num_label.show()
             self.num_seqs_input.show()
             self.region_label.show()
             self.region_input.show()
+            self.in_place_checkbox.show()
             self.bootstrap_widget.hide()
+            self.strata_widget.hide()
+        self.metadata_widget.setVisible(self.stratified_radio.isChecked() or self.dedup_checkbox.isChecked())
 
     def run_subsample(self):
         fasta_file = self.file_dir_input.text()
@@ -301,6 +422,7 @@ class SubsampleApp(QtWidgets.QMainWindow):
         output_path = self.output_input.text()
         equal_sampling = self.bootstrap_radio.isChecked()
         replicates = int(self.replicates_combo.currentText()) if equal_sampling else 1
+        stratified = self.stratified_radio.isChecked()
 
         self.statusBar().showMessage(f"Starting subsampling...", 5000)
 
@@ -309,19 +431,35 @@ class SubsampleApp(QtWidgets.QMainWindow):
             self.statusBar().showMessage("Error: Missing sequence file", 5000)
             return
 
-        if not equal_sampling and not num_seqs:
+        if stratified and not self.strata_keys_input.text().strip():
+            self.status_output.append("<b><span style='color: red;'>Error: Please specify the strata keys!</span></b>")
+            self.statusBar().showMessage("Error: Missing strata keys", 5000)
+            return
+
+        if not equal_sampling and not stratified and not num_seqs:
             self.status_output.append("<b><span style='color: red;'>Error: Please specify the number of sequences!</span></b>")
             self.statusBar().showMessage("Error: Missing number of sequences", 5000)
             return
 
         try:
             num_seqs = int(num_seqs) if num_seqs else 0
-            if not equal_sampling and num_seqs <= 0:
+            strata = None
+            if stratified:
+                cap = self.strata_cap_input.text().strip()
+                minimum = self.strata_min_input.text().strip()
+                strata = dict(keys=self.strata_keys_input.text().strip(),
+                              cap=int(cap) if cap else None,
+                              minimum=int(minimum) if minimum else 0,
+                              metadata_file=self.metadata_input.text().strip() or None)
+            elif not equal_sampling and num_seqs <= 0:
                 self.status_output.append("<b><span style='color: red;'>Error: Number of sequences must be greater than 0!</span></b>")
                 self.statusBar().showMessage("Error: Invalid number of sequences", 5000)
                 return
             self.status_output.append(f"Starting subsampling with {replicates} replicate(s)...")
-            self.thread = SubsamplingThread(fasta_file, num_seqs, region, output_path, equal_sampling, replicates)
+            self.thread = SubsamplingThread(fasta_file, num_seqs, region, output_path, equal_sampling, replicates, strata,
+                                            self.in_place_checkbox.isChecked(), self.dedup_checkbox.isChecked(),
+                                            self.dedup_keys_input.text().strip() or None,
+                                            self.metadata_input.text().strip() or None)
             self.thread.finished.connect(lambda result: self.status_output.append(result))
             self.thread.error.connect(lambda error: self.status_output.append(error))
             self.thread.status_update.connect(lambda msg: self.status_output.append(msg))
@@ -0,0 +1,171 @@
+import csv
+import math
+import os
+import random
+import re
+from collections import OrderedDict
+
+try:
+    from Subsample.fuction_subsample import write_records
+    from Subsample.index_subsample import FastaIndex
+except ModuleNotFoundError:  # imported by fuction_subsample.py run as a script
+    from fuction_subsample import write_records
+    from index_subsample import FastaIndex
+
+UNKNOWN = "Unknown"
+STRATA_SUMMARY = "strata.tsv"
+_YEAR = re.compile(r"(?<!\d)(\d{4})(?!\d)")
+
+
+def parse_strata_keys(spec):
+    """'2,country,date:year' -> [(2, None), ('country', None), ('date', 'year')].
+
+    A number is a 1-based '_'-separated header field; any other name is a metadata column.
+    The ':year' suffix keeps only the four-digit year of the value.
+    """
+    keys = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, transform = item.partition(":")
+        if transform and transform != "year":
+            raise ValueError(f"Unknown stratum key transform '{transform}' in '{item}'")
+        keys.append((int(name) if name.isdigit() else name, transform or None))
+    if not keys:
+        raise ValueError("No stratum keys given")
+    return keys
+
+
+def record_id(name):
+    """Sequence ID used to join a FASTA header with the metadata table."""
+    parts = name.lstrip(">").split()
+    return parts[0] if parts else ""
+
+
+def read_metadata(path, id_column=None):
+    """Metadata rows keyed by sequence ID; tab-separated unless the file ends in .csv."""
+    delimiter = "," if path.lower().endswith(".csv") else "\t"
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f, delimiter=delimiter)
+        if not reader.fieldnames:
+            raise ValueError(f"Metadata table {path} has no header line")
+        id_column = id_column or reader.fieldnames[0]
+        if id_column not in reader.fieldnames:
+            raise ValueError(f"Metadata table {path} has no column '{id_column}'")
+        return {row[id_column].strip(): row for row in reader}
+
+
+def stratum_keys(names, keys, metadata=None):
+    """One stratum tuple per record, from header fields and/or metadata columns, in a single pass."""
+    if metadata is not None:
+        columns = set(next(iter(metadata.values()), {}))
+        missing = [name for name, _ in keys if not isinstance(name, int) and name not in columns]
+        if missing:
+            raise ValueError(f"Metadata table has no column(s): {', '.join(missing)}")
+    elif any(not isinstance(name, int) for name, _ in keys):
+        raise ValueError("Column stratum keys need a metadata table")
+
+    strata = []
+    for name in names:
+        fields = name.lstrip(">").split("_")
+        row = metadata.get(record_id(name), {}) if metadata is not None else {}
+        stratum = []
+        for key, transform in keys:
+            if isinstance(key, int):
+                value = fields[key - 1] if 0 < key <= len(fields) else ""
+            else:
+                value = row.get(key) or ""
+            value = value.strip()
+            if transform == "year":
+                match = _YEAR.search(value)
+                value = match.group(1) if match else ""
+            stratum.append(value or UNKNOWN)
+        strata.append(tuple(stratum))
+    return strata
+
+
+def group_strata(strata):
+    groups = OrderedDict()
+    for i, stratum in enumerate(strata):
+        groups.setdefault(stratum, []).append(i)
+    return groups
+
+
+def allocate(sizes, total=None, cap=None, minimum=0):
+    """Sequences to draw from each stratum.
+
+    Without `total` every stratum contributes min(size, cap). With `total`, each stratum first gets
+    min(minimum, size, cap), and the rest is shared in proportion to stratum size (largest remainder),
+    never exceeding a stratum's size or the cap.
+    """
+    limits = {k: size if cap is None else min(size, cap) for k, size in sizes.items()}
+    if total is None:
+        return limits
+
+    allocation = {k: min(minimum, limit) for k, limit in limits.items()}
+    remaining = total - sum(allocation.values())
+    if remaining < 0:
+        raise ValueError(f"Minimum quotas need {total - remaining} sequences, more than the requested {total}.")
+    if total > sum(limits.values()):
+        raise ValueError(f"Requested {total} sequences, but only {sum(limits.values())} available within the caps.")
+
+    open_strata = [k for k in allocation if allocation[k] < limits[k]]
+    while remaining and open_strata:
+        weight = sum(sizes[k] for k in open_strata)
+        quotas = {k: remaining * sizes[k] / weight for k in open_strata}
+        capped = [k for k in open_strata if quotas[k] >= limits[k] - allocation[k]]
+        if capped:
+            # Strata whose quota reaches the cap are filled, and the rest is shared again among the others
+            for k in capped:
+                remaining -= limits[k] - allocation[k]
+                allocation[k] = limits[k]
+            open_strata = [k for k in open_strata if allocation[k] < limits[k]]
+            continue
+        for k in open_strata:
+            allocation[k] += math.floor(quotas[k])
+            remaining -= math.floor(quotas[k])
+        # Largest remainder: the leftover goes one at a time by fractional part of the quotas
+        for k in sorted(open_strata, key=lambda k: quotas[k] - math.floor(quotas[k]), reverse=True)[:remaining]:
+            allocation[k] += 1
+        remaining = 0
+    return allocation
+
+
+def run_stratified(fasta_file, keys, total=None, cap=None, minimum=0, metadata_file=None, id_column=None,
+                   output_dir=None, output_file_name="extract.fas", seed=None):
+    """Draw a stratified subsample in one pass over the headers; also writes a per-stratum summary."""
+    if isinstance(keys, str):
+        keys = parse_strata_keys(keys)
+    metadata = read_metadata(metadata_file, id_column) if metadata_file else None
+    rng = random if seed is None else random.Random(seed)
+    try:
+        index = FastaIndex(fasta_file)
+    except Exception as e:
+        raise Exception(f"Error reading FASTA file: {str(e)}")
+
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(__file__))
+    extract_file = os.path.join(output_dir, output_file_name)
+
+    with index:
+        groups = group_strata(stratum_keys(index.names, keys, metadata))
+        if not groups:
+            raise ValueError("The FASTA file contains no sequences.")
+        allocation = allocate({k: len(v) for k, v in groups.items()}, total, cap, minimum)
+
+        sampled_indices = []
+        for stratum, members in groups.items():
+            sampled_indices.extend(rng.sample(members, allocation[stratum]))
+        try:
+            write_records(extract_file, index.records(sampled_indices))
+        except Exception as e:
+            raise Exception(f"Error writing output file {extract_file}: {str(e)}")
+
+    summary_file = os.path.join(output_dir, STRATA_SUMMARY)
+    with open(summary_file, "w", encoding="utf-8") as f:
+        f.write("\t".join(str(name) for name, _ in keys) + "\tavailable\tselected\n")
+        for stratum, members in groups.items():
+            f.write("\t".join(stratum) + f"\t{len(members)}\t{allocation[stratum]}\n")
+
+    return f"<b><span style='color: green;'>Done! Selected {len(sampled_indices)} sequences from {len(groups)} strata. Output file: {extract_file}, strata summary: {summary_file}</span></b>"
@@ -12,6 +12,7 @@ import matplotlib
 from io import StringIO
 import sys
 from scipy.stats import linregress
+from Location_mapping import load_mapping
 
 
 matplotlib.rcParams['font.family'] = 'Arial'
@@ -35,21 +36,16 @@ class TreeTimeWorker(QThread):
         self.mapping_file = mapping_file if mapping_file else DEFAULT_MAPPING_FILE
     def load_mapping(self):
         try:
-            mapping = {}
             file_path = self.mapping_file
             if not os.path.exists(file_path):
                 self.log_signal.emit(f"Mapping file not found at: {file_path}")
-                return {}
-            with open(file_path, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        region, location = line.strip().split('\t')
-                        mapping[location] = region
+                return None
+            mapping = load_mapping(file_path)
             self.log_signal.emit(f"Loaded mapping file: {file_path}")
             return mapping
         except Exception as e:
             self.log_signal.emit(f"Error loading mapping file: {str(e)}")
-            return {}
+            return None
     def capture_treetime_logs(self, func, *args, **kwargs):
         old_stdout = sys.stdout
         sys.stdout = StringIO()
@@ -102,20 +98,6 @@ class TreeTimeWorker(QThread):
             self.log_signal.emit(f"Warning: The following date entries are not in the tree: {missing_in_tree}")
         return True
 
-    def load_mapping(self):
-        try:
-            mapping = {}
-            with open(self.mapping_file, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        region, location = line.strip().split('\t')
-                        mapping[location] = region
-            self.log_signal.emit(f"Loaded mapping file: {self.mapping_file}")
-            return mapping
-        except Exception as e:
-            self.log_signal.emit(f"Error loading mapping file: {str(e)}")
-            return {}
-
     def run(self):
         try:
 
@@ -149,15 +131,12 @@ class TreeTimeWorker(QThread):
 
                 location_to_region = self.load_mapping()
   
-                region_map = {}
-                unmapped_locations = []
-                for name, loc in locations.items():
-                    region = location_to_region.get(loc, None)
-                    if region:
-                        region_map[name] = region
-                    else:
-                        unmapped_locations.append(loc)
-                        region_map[name] = "Unknown"
+                if location_to_region is not None:
+                    regions = location_to_region.map_series(metadata['location'])
+                else:
+                    regions = pd.Series("Unknown", index=metadata.index)
+                region_map = dict(zip(metadata['name'], regions))
+                unmapped_locations = metadata.loc[regions == "Unknown", 'location'].tolist()
                 if unmapped_locations:
                     self.log_signal.emit(f"The following locations were not found in the mapping file and will be labeled 'Unknown': {set(unmapped_locations)}")
 
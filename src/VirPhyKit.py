@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QIcon
@@ -422,6 +423,7 @@ class MainWindow(QMainWindow):
         self.tab_widget.setCurrentWidget(default_tab)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()